@@ -0,0 +1,63 @@
+"""index hot query shapes
+
+Revision ID: 0a9e6b3d4f21
+Revises: f7c2d8e5a913
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0a9e6b3d4f21"
+down_revision: str | Sequence[str] | None = "f7c2d8e5a913"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+# Built CONCURRENTLY so live tables are not locked against writes.
+INDEXES = [
+    # A user's conversations: inbox, user socket subscriptions, DM lookup.
+    ("ix_conversation_members_user_id_conversation_id", "conversation_members",
+     ["user_id", "conversation_id"], None),
+    # ON DELETE SET NULL when a message is deleted.
+    ("ix_conversation_members_last_read_message_id", "conversation_members",
+     ["last_read_message_id"], "last_read_message_id IS NOT NULL"),
+    # ON DELETE CASCADE when a user is deleted.
+    ("ix_messages_sender_id", "messages", ["sender_id"], None),
+    # ON DELETE SET NULL when a user is deleted.
+    ("ix_conversations_created_by", "conversations", ["created_by"], "created_by IS NOT NULL"),
+]
+
+# Duplicates of the primary key indexes.
+REDUNDANT_INDEXES = [
+    ("ix_users_id", "users"),
+    ("ix_conversations_id", "conversations"),
+    ("ix_conversation_members_id", "conversation_members"),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+        for name, table in REDUNDANT_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table in REDUNDANT_INDEXES:
+            op.create_index(name, table, ["id"], postgresql_concurrently=True, if_not_exists=True)
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
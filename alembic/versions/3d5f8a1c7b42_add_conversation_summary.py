@@ -0,0 +1,83 @@
+"""add conversation summary
+
+Revision ID: 3d5f8a1c7b42
+Revises: 0a9e6b3d4f21
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3d5f8a1c7b42"
+down_revision: str | Sequence[str] | None = "0a9e6b3d4f21"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("last_message_id", sa.UUID(), nullable=True))
+    op.add_column(
+        "conversations",
+        sa.Column("last_message_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column(
+        "conversations", sa.Column("last_message_preview", sa.String(length=200), nullable=True)
+    )
+    op.add_column(
+        "conversations",
+        sa.Column("message_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "conversations",
+        sa.Column("member_count", sa.Integer(), server_default="0", nullable=False),
+    )
+
+    # Backfill from the source tables. updated_at becomes the time of the last
+    # message, since the inbox now orders by activity.
+    op.execute(
+        """
+        UPDATE conversations AS c
+        SET last_message_id = last.id,
+            last_message_at = last.created_at,
+            last_message_preview = left(last.content, 200),
+            updated_at = greatest(c.updated_at, last.created_at)
+        FROM (
+            SELECT DISTINCT ON (conversation_id) conversation_id, id, created_at, content
+            FROM messages
+            ORDER BY conversation_id, created_at DESC, id DESC
+        ) AS last
+        WHERE last.conversation_id = c.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE conversations AS c
+        SET message_count = counts.n
+        FROM (SELECT conversation_id, count(*) AS n FROM messages GROUP BY conversation_id) AS counts
+        WHERE counts.conversation_id = c.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE conversations AS c
+        SET member_count = counts.n
+        FROM (
+            SELECT conversation_id, count(*) AS n
+            FROM conversation_members
+            GROUP BY conversation_id
+        ) AS counts
+        WHERE counts.conversation_id = c.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("conversations", "member_count")
+    op.drop_column("conversations", "message_count")
+    op.drop_column("conversations", "last_message_preview")
+    op.drop_column("conversations", "last_message_at")
+    op.drop_column("conversations", "last_message_id")
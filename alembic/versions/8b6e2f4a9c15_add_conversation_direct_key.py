@@ -0,0 +1,55 @@
+"""add conversation direct key
+
+Revision ID: 8b6e2f4a9c15
+Revises: 3d5f8a1c7b42
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8b6e2f4a9c15"
+down_revision: str | Sequence[str] | None = "3d5f8a1c7b42"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("direct_key", sa.String(length=73), nullable=True))
+
+    # Key existing one-to-one conversations by their ordered member pair. Where
+    # a race already created duplicates, only the oldest gets the key, so the
+    # unique constraint holds and lookups resolve to it.
+    op.execute(
+        """
+        WITH pairs AS (
+            SELECT c.id,
+                   min(m.user_id::text) || ':' || max(m.user_id::text) AS direct_key,
+                   c.created_at
+            FROM conversations AS c
+            JOIN conversation_members AS m ON m.conversation_id = c.id
+            WHERE NOT c.is_group
+            GROUP BY c.id, c.created_at
+            HAVING count(*) = 2
+        ),
+        ranked AS (
+            SELECT id, direct_key,
+                   row_number() OVER (PARTITION BY direct_key ORDER BY created_at, id) AS rank
+            FROM pairs
+        )
+        UPDATE conversations AS c
+        SET direct_key = ranked.direct_key
+        FROM ranked
+        WHERE ranked.id = c.id AND ranked.rank = 1
+        """
+    )
+    op.create_unique_constraint("uq_conversations_direct_key", "conversations", ["direct_key"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_conversations_direct_key", "conversations", type_="unique")
+    op.drop_column("conversations", "direct_key")
@@ -0,0 +1,64 @@
+"""add member read cursor
+
+Revision ID: e4b91f0a6c2d
+Revises: c3a7b12c9d10
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e4b91f0a6c2d"
+down_revision: str | Sequence[str] | None = "c3a7b12c9d10"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "conversation_members",
+        sa.Column("last_read_message_id", sa.UUID(), nullable=True),
+    )
+    op.add_column(
+        "conversation_members",
+        sa.Column("last_read_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_foreign_key(
+        "fk_conversation_members_last_read_message_id_messages",
+        "conversation_members",
+        "messages",
+        ["last_read_message_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+
+    # Seed cursors from the old per-message flag: a member has read up to the
+    # newest message that was flagged read or that they sent themselves. Both
+    # halves of the (created_at, id) cursor come from that one message.
+    op.execute(
+        """
+        UPDATE conversation_members AS cm
+        SET (last_read_message_id, last_read_at) = (
+            SELECT m.id, m.created_at
+            FROM messages AS m
+            WHERE m.conversation_id = cm.conversation_id
+              AND (m.is_read OR m.sender_id = cm.user_id)
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT 1
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "fk_conversation_members_last_read_message_id_messages",
+        "conversation_members",
+        type_="foreignkey",
+    )
+    op.drop_column("conversation_members", "last_read_at")
+    op.drop_column("conversation_members", "last_read_message_id")
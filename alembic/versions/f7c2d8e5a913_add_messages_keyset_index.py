@@ -0,0 +1,28 @@
+"""add messages keyset index
+
+Revision ID: f7c2d8e5a913
+Revises: e4b91f0a6c2d
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f7c2d8e5a913"
+down_revision: str | Sequence[str] | None = "e4b91f0a6c2d"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_messages_conversation_id_created_at_id",
+        "messages",
+        ["conversation_id", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_conversation_id_created_at_id", table_name="messages")
@@ -2,7 +2,7 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, status
 from fastapi.security import OAuth2PasswordRequestForm
 
-from app.core.auth import get_current_active_user, get_current_active_user_dependency
+from app.core.auth import get_current_active_user_dependency, get_current_user_record
 from app.db.database import async_session
 from app.models.user import User
 from app.schemas.token import TokenResponse, UserRegisterResponse, RefreshTokenRequest
@@ -44,6 +44,6 @@ async def refresh_token(
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(
-    current_user: Annotated[User, Depends(get_current_active_user)]
+    current_user: Annotated[User, Depends(get_current_user_record)]
 ):
     return current_user
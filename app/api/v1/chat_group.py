@@ -1,12 +1,13 @@
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 
 from app.core.auth import get_current_active_user
 from app.db.database import async_session
-from app.models.user import User
 from app.schemas.conversation import (
     AddMemberRequest,
+    BulkAddMembersRequest,
     ConversationResponse,
     GroupCreateRequest,
     GroupDetailResponse,
@@ -14,21 +15,23 @@ from app.schemas.conversation import (
     GroupUpdateRequest,
     UpdateMemberRoleRequest,
 )
+from app.schemas.user import Principal
 from app.services.conversation import (
     ROLE_OWNER,
     add_group_member,
+    add_group_members,
     can_manage_members,
     can_update_group,
     create_group_conversation,
     get_conversation_by_id,
-    get_conversation_member_count,
     get_conversation_members,
     get_membership,
     remove_group_member,
     update_group_conversation,
     update_member_role,
 )
-from app.utils.user import get_user_by_id
+from app.services.membership import get_cached_membership
+from app.utils.user import get_missing_user_ids, get_user_by_id
 
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
@@ -38,18 +41,12 @@ router = APIRouter(prefix="/chat", tags=["Chat"])
 async def create_group(
     payload: GroupCreateRequest,
     session: async_session,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     unique_member_ids = set(payload.member_ids)
     unique_member_ids.discard(current_user.id)
 
-    for member_id in unique_member_ids:
-        user = await get_user_by_id(member_id, session)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"User not found: {member_id}",
-            )
+    await _ensure_users_exist(unique_member_ids, session)
 
     conversation = await create_group_conversation(
         creator_id=current_user.id,
@@ -66,14 +63,13 @@ async def create_group(
 async def get_group_detail(
     conversation_id: UUID,
     session: async_session,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     conversation = await _get_group_or_404(conversation_id, session)
-    member = await get_membership(conversation_id, current_user.id, session)
-    if not member:
+    membership = await get_cached_membership(conversation_id, current_user.id, session)
+    if membership.role is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member")
 
-    member_count = await get_conversation_member_count(conversation_id, session)
     return {
         "id": conversation.id,
         "is_group": conversation.is_group,
@@ -82,7 +78,7 @@ async def get_group_detail(
         "avatar_url": conversation.avatar_url,
         "created_by": conversation.created_by,
         "created_at": conversation.created_at,
-        "member_count": member_count,
+        "member_count": conversation.member_count,
     }
 
 
@@ -91,11 +87,11 @@ async def update_group(
     conversation_id: UUID,
     payload: GroupUpdateRequest,
     session: async_session,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     conversation = await _get_group_or_404(conversation_id, session)
-    membership = await get_membership(conversation_id, current_user.id, session)
-    if not membership or not can_update_group(membership.role):
+    membership = await get_cached_membership(conversation_id, current_user.id, session)
+    if not can_update_group(membership.role):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
     return await update_group_conversation(
@@ -111,7 +107,7 @@ async def update_group(
 async def get_group_members(
     conversation_id: UUID,
     session: async_session,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     await _ensure_group_member(conversation_id, current_user.id, session)
     members = await get_conversation_members(conversation_id, session)
@@ -130,7 +126,7 @@ async def add_member(
     conversation_id: UUID,
     payload: AddMemberRequest,
     session: async_session,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     await _ensure_group_manager(conversation_id, current_user.id, session)
 
@@ -138,11 +134,15 @@ async def add_member(
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    existing = await get_membership(conversation_id, payload.user_id, session)
-    if existing:
+    # Checked against the database: a stale cached miss must not reach the insert.
+    if await get_membership(conversation_id, payload.user_id, session) is not None:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already a member")
 
-    member = await add_group_member(conversation_id, payload.user_id, session)
+    try:
+        member = await add_group_member(conversation_id, payload.user_id, session)
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already a member")
     return {
         "user_id": member.user_id,
         "role": member.role,
@@ -150,17 +150,49 @@ async def add_member(
     }
 
 
+@router.post(
+    "/groups/{conversation_id}/members/bulk",
+    response_model=list[GroupMemberResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+async def add_members_bulk(
+    conversation_id: UUID,
+    payload: BulkAddMembersRequest,
+    session: async_session,
+    current_user: Principal = Depends(get_current_active_user),
+):
+    await _ensure_group_manager(conversation_id, current_user.id, session)
+    await _ensure_users_exist(set(payload.user_ids), session)
+
+    try:
+        members = await add_group_members(conversation_id, payload.user_ids, session)
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Members changed concurrently, retry",
+        )
+    return [
+        {
+            "user_id": member.user_id,
+            "role": member.role,
+            "joined_at": member.joined_at,
+        }
+        for member in members
+    ]
+
+
 @router.delete("/groups/{conversation_id}/members/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_member(
     conversation_id: UUID,
     user_id: UUID,
     session: async_session,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     await _ensure_group_manager(conversation_id, current_user.id, session)
 
-    membership = await get_membership(conversation_id, user_id, session)
-    if not membership:
+    membership = await get_cached_membership(conversation_id, user_id, session)
+    if membership.role is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Member not found")
 
     if membership.role == ROLE_OWNER:
@@ -175,12 +207,12 @@ async def patch_member_role(
     user_id: UUID,
     payload: UpdateMemberRoleRequest,
     session: async_session,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     await _ensure_group_manager(conversation_id, current_user.id, session)
 
-    membership = await get_membership(conversation_id, user_id, session)
-    if not membership:
+    membership = await get_cached_membership(conversation_id, user_id, session)
+    if membership.role is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Member not found")
 
     if membership.role == ROLE_OWNER:
@@ -197,6 +229,15 @@ async def patch_member_role(
     }
 
 
+async def _ensure_users_exist(user_ids: set[UUID], session: async_session):
+    missing = await get_missing_user_ids(user_ids, session)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User not found: {min(missing)}",
+        )
+
+
 async def _get_group_or_404(conversation_id: UUID, session: async_session):
     conversation = await get_conversation_by_id(conversation_id, session)
     if not conversation or not conversation.is_group:
@@ -204,16 +245,18 @@ async def _get_group_or_404(conversation_id: UUID, session: async_session):
     return conversation
 
 
-async def _ensure_group_member(conversation_id: UUID, user_id: UUID, session: async_session):
-    await _get_group_or_404(conversation_id, session)
-    membership = await get_membership(conversation_id, user_id, session)
-    if not membership:
+async def _ensure_group_member(conversation_id: UUID, user_id: UUID, session: async_session) -> str:
+    """The caller's role, from the membership cache: usually no query at all."""
+    membership = await get_cached_membership(conversation_id, user_id, session)
+    if not membership.is_group:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
+    if membership.role is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member")
-    return membership
+    return membership.role
 
 
-async def _ensure_group_manager(conversation_id: UUID, user_id: UUID, session: async_session):
-    membership = await _ensure_group_member(conversation_id, user_id, session)
-    if not can_manage_members(membership.role):
+async def _ensure_group_manager(conversation_id: UUID, user_id: UUID, session: async_session) -> str:
+    role = await _ensure_group_member(conversation_id, user_id, session)
+    if not can_manage_members(role):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    return membership
+    return role
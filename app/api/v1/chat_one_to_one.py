@@ -1,21 +1,31 @@
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from redis.exceptions import RedisError
 
 from app.core.auth import get_current_active_user
+from app.core.ws import ws_manager
 from app.db.database import async_session
-from app.models.user import User
 from app.schemas.conversation import (
     ConversationCreateRequest,
     ConversationListItem,
     ConversationResponse,
+    MemberPresenceResponse,
+    ReadCursorRequest,
+    ReadCursorResponse,
 )
 from app.schemas.message import MessageResponse
+from app.schemas.user import Principal
+from app.schemas.ws import WSReadOut
 from app.services.conversation import (
+    get_conversation_members,
+    get_membership,
     get_or_create_one_to_one_conversation,
+    get_user_inbox,
     is_user_in_conversation,
-    list_user_conversations,
+    mark_conversation_read,
 )
+from app.services.ephemeral import PRESENCE_OFFLINE, get_presence
 from app.services.message import get_messages_for_conversation
 from app.utils.user import get_user_by_id
 
@@ -26,16 +36,18 @@ router = APIRouter(prefix="/chat", tags=["Chat"])
 @router.get("/conversations", response_model=list[ConversationListItem])
 async def get_my_conversations(
     session: async_session,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
 ):
-    return await list_user_conversations(current_user.id, session)
+    return await get_user_inbox(current_user.id, session, offset=offset, limit=limit)
 
 
 @router.post("/conversations", response_model=ConversationResponse, status_code=status.HTTP_201_CREATED)
 async def create_conversation(
     payload: ConversationCreateRequest,
     session: async_session,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     if payload.recipient_id == current_user.id:
         raise HTTPException(
@@ -57,13 +69,76 @@ async def create_conversation(
 async def get_conversation_messages(
     conversation_id: UUID,
     session: async_session,
-    current_user: User = Depends(get_current_active_user),
-    skip: int = Query(0, ge=0),
+    current_user: Principal = Depends(get_current_active_user),
+    before: UUID | None = Query(None, description="Return messages older than this message"),
+    after: UUID | None = Query(None, description="Return messages newer than this message"),
     limit: int = Query(50, ge=1, le=200),
 ):
+    if before is not None and after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either before or after, not both",
+        )
+
     is_member = await is_user_in_conversation(conversation_id, current_user.id, session)
     if not is_member:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member")
 
-    messages = await get_messages_for_conversation(conversation_id, skip, limit, session)
+    messages = await get_messages_for_conversation(
+        conversation_id, limit, session, before=before, after=after
+    )
+    if messages is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cursor message not found")
     return messages
+
+
+@router.post("/conversations/{conversation_id}/read", response_model=ReadCursorResponse)
+async def mark_read(
+    conversation_id: UUID,
+    session: async_session,
+    payload: ReadCursorRequest | None = None,
+    current_user: Principal = Depends(get_current_active_user),
+):
+    membership = await mark_conversation_read(
+        conversation_id,
+        current_user.id,
+        session,
+        message_id=payload.message_id if payload else None,
+    )
+    if membership is None:
+        # Nothing moved: not a member, or the cursor is already there.
+        membership = await get_membership(conversation_id, current_user.id, session)
+        if not membership:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member")
+        return membership
+
+    frame = WSReadOut(
+        conversation_id=conversation_id,
+        user_id=current_user.id,
+        last_read_message_id=membership.last_read_message_id,
+        last_read_at=membership.last_read_at,
+    ).model_dump_json()
+    try:
+        await ws_manager.publish(conversation_id, frame)
+    except RedisError:
+        pass
+    return membership
+
+
+@router.get("/conversations/{conversation_id}/presence", response_model=list[MemberPresenceResponse])
+async def get_conversation_presence(
+    conversation_id: UUID,
+    session: async_session,
+    current_user: Principal = Depends(get_current_active_user),
+):
+    is_member = await is_user_in_conversation(conversation_id, current_user.id, session)
+    if not is_member:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member")
+
+    members = await get_conversation_members(conversation_id, session)
+    member_ids = [member.user_id for member in members]
+    presence = await get_presence(member_ids)
+    return [
+        {"user_id": user_id, "status": presence.get(user_id, PRESENCE_OFFLINE)}
+        for user_id in member_ids
+    ]
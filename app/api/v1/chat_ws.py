@@ -1,44 +1,62 @@
 from uuid import UUID
-import json
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
-from fastapi.encoders import jsonable_encoder
-from pydantic import ValidationError
+from redis.exceptions import RedisError
 
-from app.core.redis import redis_client
+from app.core.codecs import negotiate_codec
+from app.core.config import settings
+from app.core.rate_limit import RedisTokenBucket, TokenBucket
 from app.core.security import verify_access_token
-from app.core.ws import ws_manager
+from app.core.ws import ClientConnection, ws_manager
 from app.db.database import async_session_maker
+from app.models.message import Message
 from app.schemas.message import MessageResponse
-from app.schemas.ws import WSErrorOut, WSMessageIn, WSMessageOut
-from app.services.conversation import get_conversation_by_id, is_user_in_conversation
-from app.services.message import create_message
+from app.schemas.ws import (
+    WSErrorOut,
+    WSMessageIn,
+    WSMessageOut,
+    WSPresenceIn,
+    WSPongIn,
+    WSPresenceOut,
+    WSReplayTruncatedOut,
+    WSSubscribeIn,
+    WSSubscriptionOut,
+    WSTypingIn,
+    WSTypingOut,
+    WSUnsubscribeIn,
+    ws_client_frame_adapter,
+)
+from app.services.access import can_access_conversation
+from app.services.conversation import list_user_conversation_ids
+from app.services.ephemeral import EventCoalescer, set_presence
+from app.services.message import get_messages_after
+from app.services.message_writer import message_writer
 from app.utils.user import get_user_by_id
 
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+user_send_limiter = RedisTokenBucket(
+    "ratelimit:ws_send",
+    rate=settings.WS_USER_SEND_RATE_PER_SECOND,
+    capacity=settings.WS_USER_SEND_BURST,
+)
 
-@router.websocket("/ws/conversations/{conversation_id}")
-async def websocket_chat(websocket: WebSocket, conversation_id: UUID):
-    token = _get_bearer_token(websocket)
-    if not token:
-        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-        return
 
-    payload = verify_access_token(token)
-    if payload is None:
-        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+@router.websocket("/ws")
+async def websocket_user(websocket: WebSocket):
+    """One socket per user, subscribed to all of the user's conversations."""
+    if ws_manager.draining:
+        await websocket.close(code=status.WS_1012_SERVICE_RESTART)
         return
 
-    user_id = payload.get("sub")
-    if user_id is None:
-        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+    negotiated = negotiate_codec(websocket)
+    if negotiated is None:
+        await websocket.close(code=status.WS_1002_PROTOCOL_ERROR)
         return
 
-    try:
-        user_uuid = UUID(user_id)
-    except ValueError:
+    user_uuid = _get_token_user_id(websocket)
+    if user_uuid is None:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
@@ -48,50 +66,305 @@ async def websocket_chat(websocket: WebSocket, conversation_id: UUID):
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
 
-        conversation = await get_conversation_by_id(conversation_id, session)
-        if not conversation:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
+        conversation_ids = await list_user_conversation_ids(user_uuid, session)
 
-        is_member = await is_user_in_conversation(conversation_id, user.id, session)
-        if not is_member:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-
-    await websocket.accept()
-    await ws_manager.connect(conversation_id, websocket)
+    codec, subprotocol = negotiated
+    await websocket.accept(subprotocol=subprotocol)
+    connection = ws_manager.register(websocket, codec)
+    send_bucket = _new_send_bucket()
+    coalescer = _new_coalescer()
 
     try:
+        await ws_manager.subscribe(connection, *conversation_ids)
+
         while True:
-            data = await websocket.receive_json()
             try:
-                message_in = WSMessageIn.model_validate(data)
-            except ValidationError as exc:
-                await websocket.send_json(WSErrorOut(detail=str(exc)).model_dump())
+                frame_in = ws_client_frame_adapter.validate_python(await connection.receive())
+            except ValueError as exc:
+                # Undecodable payloads and schema violations (ValidationError) alike.
+                connection.send(WSErrorOut(detail=str(exc)).model_dump_json())
                 continue
 
-            async with async_session_maker() as session:
-                message = await create_message(
-                    conversation_id=conversation_id,
-                    sender_id=user_uuid,
-                    content=message_in.content,
-                    session=session,
+            if isinstance(frame_in, WSPongIn):
+                pass  # receive() already recorded the heartbeat
+            elif isinstance(frame_in, WSSubscribeIn):
+                await _handle_subscribe(connection, user_uuid, frame_in)
+            elif isinstance(frame_in, WSUnsubscribeIn):
+                await ws_manager.unsubscribe(connection, frame_in.conversation_id)
+                connection.send(
+                    WSSubscriptionOut(
+                        type="unsubscribed", conversation_id=frame_in.conversation_id
+                    ).model_dump_json()
                 )
+            elif isinstance(frame_in, WSPresenceIn):
+                await _handle_presence(
+                    coalescer, user_uuid, frame_in, list(connection.conversation_ids)
+                )
+            elif frame_in.conversation_id not in connection.conversation_ids:
+                connection.send(
+                    WSErrorOut(
+                        conversation_id=frame_in.conversation_id,
+                        detail="Not subscribed to this conversation.",
+                    ).model_dump_json()
+                )
+            elif isinstance(frame_in, WSTypingIn):
+                await _handle_typing(coalescer, user_uuid, frame_in.conversation_id, frame_in)
+            else:
+                await _send_message(
+                    connection, send_bucket, frame_in.conversation_id, user_uuid, frame_in
+                )
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await ws_manager.disconnect(connection)
+
+
+@router.websocket("/ws/conversations/{conversation_id}")
+async def websocket_chat(
+    websocket: WebSocket,
+    conversation_id: UUID,
+    last_message_id: UUID | None = None,
+):
+    if ws_manager.draining:
+        await websocket.close(code=status.WS_1012_SERVICE_RESTART)
+        return
+
+    negotiated = negotiate_codec(websocket)
+    if negotiated is None:
+        await websocket.close(code=status.WS_1002_PROTOCOL_ERROR)
+        return
+
+    user_uuid = _get_token_user_id(websocket)
+    if user_uuid is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    # Reconnect storms are served from the membership and principal caches;
+    # a miss is one query.
+    async with async_session_maker() as session:
+        allowed = await can_access_conversation(user_uuid, conversation_id, session)
+    if not allowed:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    codec, subprotocol = negotiated
+    await websocket.accept(subprotocol=subprotocol)
+    connection = ws_manager.register(websocket, codec)
+    send_bucket = _new_send_bucket()
+    coalescer = _new_coalescer()
 
-            message_out = MessageResponse.model_validate(message)
-            payload_out = WSMessageOut(message=message_out).model_dump()
+    try:
+        if last_message_id is None:
+            await ws_manager.subscribe(connection, conversation_id)
+        else:
+            # Subscribe before reading the gap so nothing published meanwhile is lost.
+            connection.hold()
+            await ws_manager.subscribe(connection, conversation_id)
+            await _replay_missed(connection, conversation_id, last_message_id)
 
+        while True:
             try:
-                json_compatible_payload = jsonable_encoder(payload_out)
-                channel = f"conversation:{conversation_id}"
-                await redis_client.publish(channel, json.dumps(json_compatible_payload))
-            except Exception:
-                await websocket.send_json({"type": "error", "detail": "Message saved but broadcast failed."})
+                frame_in = ws_client_frame_adapter.validate_python(await connection.receive())
+            except ValueError as exc:
+                # Undecodable payloads and schema violations (ValidationError) alike.
+                connection.send(WSErrorOut(detail=str(exc)).model_dump_json())
+                continue
+
+            if isinstance(frame_in, WSPongIn):
+                continue  # receive() already recorded the heartbeat
+
+            if isinstance(frame_in, (WSSubscribeIn, WSUnsubscribeIn)):
+                connection.send(
+                    WSErrorOut(detail="Subscriptions require the user-level socket.").model_dump_json()
+                )
+                continue
+
+            if getattr(frame_in, "conversation_id", None) not in (None, conversation_id):
+                connection.send(
+                    WSErrorOut(detail="conversation_id does not match this socket.").model_dump_json()
+                )
+                continue
+
+            if isinstance(frame_in, WSPresenceIn):
+                await _handle_presence(coalescer, user_uuid, frame_in, [conversation_id])
+            elif isinstance(frame_in, WSTypingIn):
+                await _handle_typing(coalescer, user_uuid, conversation_id, frame_in)
+            else:
+                await _send_message(connection, send_bucket, conversation_id, user_uuid, frame_in)
 
     except WebSocketDisconnect:
         pass
     finally:
-        await ws_manager.disconnect(conversation_id, websocket)
+        await ws_manager.disconnect(connection)
+
+
+async def _handle_subscribe(
+    connection: ClientConnection, user_id: UUID, frame_in: WSSubscribeIn
+) -> None:
+    conversation_id = frame_in.conversation_id
+    if conversation_id not in connection.conversation_ids:
+        async with async_session_maker() as session:
+            is_member = await can_access_conversation(user_id, conversation_id, session)
+        if not is_member:
+            connection.send(
+                WSErrorOut(conversation_id=conversation_id, detail="Not a member").model_dump_json()
+            )
+            return
+
+    if frame_in.last_message_id is not None:
+        connection.hold()
+    await ws_manager.subscribe(connection, conversation_id)
+    connection.send(
+        WSSubscriptionOut(type="subscribed", conversation_id=conversation_id).model_dump_json()
+    )
+    if frame_in.last_message_id is not None:
+        await _replay_missed(connection, conversation_id, frame_in.last_message_id)
+
+
+async def _replay_missed(
+    connection: ClientConnection, conversation_id: UUID, last_message_id: UUID
+) -> None:
+    """Deliver what was published after ``last_message_id``, then resume live frames.
+
+    The Redis replay stream covers the recent past; older cursors fall back
+    to the database. A gap wider than WS_REPLAY_MAX_MESSAGES, or a cursor we
+    cannot find, yields ``replay.truncated`` so the client reloads history.
+    """
+    limit = settings.WS_REPLAY_MAX_MESSAGES
+    try:
+        frames = await ws_manager.replay(conversation_id, last_message_id, limit)
+    except RedisError:
+        frames = None
+
+    if frames is None:
+        async with async_session_maker() as session:
+            messages = await get_messages_after(
+                conversation_id, last_message_id, limit + 1, session
+            )
+        if messages is None or len(messages) > limit:
+            frames = [WSReplayTruncatedOut(conversation_id=conversation_id).model_dump_json()]
+        else:
+            frames = [_encode_message(conversation_id, message) for message in messages]
+
+    connection.release(frames)
+
+
+async def _send_message(
+    connection: ClientConnection,
+    send_bucket: TokenBucket,
+    conversation_id: UUID,
+    sender_id: UUID,
+    message_in: WSMessageIn,
+) -> None:
+    # Throttle before any DB or broker work: per socket locally, per user across workers.
+    retry_after = send_bucket.acquire()
+    if not retry_after:
+        retry_after = await user_send_limiter.acquire(str(sender_id))
+        if retry_after:
+            # Refused across workers: this socket's own burst is left intact.
+            send_bucket.refund()
+    if retry_after:
+        connection.send(
+            WSErrorOut(
+                conversation_id=conversation_id,
+                detail="Rate limit exceeded.",
+                retry_after=round(retry_after, 3),
+            ).model_dump_json()
+        )
+        return
+
+    message = await message_writer.write(
+        conversation_id=conversation_id,
+        sender_id=sender_id,
+        content=message_in.content,
+    )
+
+    # Encoded once here; Redis and every recipient socket reuse this frame.
+    frame = _encode_message(conversation_id, message)
+
+    try:
+        await ws_manager.publish(conversation_id, frame, message_id=message.id)
+    except Exception:
+        connection.send(
+            WSErrorOut(
+                conversation_id=conversation_id,
+                detail="Message saved but broadcast failed.",
+            ).model_dump_json()
+        )
+
+
+async def _handle_typing(
+    coalescer: EventCoalescer, user_id: UUID, conversation_id: UUID, frame_in: WSTypingIn
+) -> None:
+    """Fan a typing indicator out over Redis only; it is never persisted."""
+    if not coalescer.should_send(("typing", conversation_id), frame_in.type):
+        return
+
+    frame = WSTypingOut(
+        type=frame_in.type, conversation_id=conversation_id, user_id=user_id
+    ).model_dump_json()
+    try:
+        await ws_manager.publish(conversation_id, frame)
+    except RedisError:
+        pass
+
+
+async def _handle_presence(
+    coalescer: EventCoalescer,
+    user_id: UUID,
+    frame_in: WSPresenceIn,
+    conversation_ids: list[UUID],
+) -> None:
+    """Refresh the user's presence TTL and announce changes to their conversations."""
+    presence = frame_in.type.removeprefix("presence.")
+    try:
+        await set_presence(user_id, presence)
+        if coalescer.should_send("presence", frame_in.type):
+            await ws_manager.publish_many(
+                {
+                    conversation_id: WSPresenceOut(
+                        type=frame_in.type, conversation_id=conversation_id, user_id=user_id
+                    ).model_dump_json()
+                    for conversation_id in conversation_ids
+                }
+            )
+    except RedisError:
+        pass
+
+
+def _new_coalescer() -> EventCoalescer:
+    return EventCoalescer(window=settings.WS_TYPING_COALESCE_SECONDS)
+
+
+def _new_send_bucket() -> TokenBucket:
+    return TokenBucket(rate=settings.WS_SEND_RATE_PER_SECOND, capacity=settings.WS_SEND_BURST)
+
+
+def _encode_message(conversation_id: UUID, message: Message) -> str:
+    return WSMessageOut(
+        conversation_id=conversation_id,
+        message=MessageResponse.model_validate(message),
+    ).model_dump_json()
+
+
+def _get_token_user_id(websocket: WebSocket) -> UUID | None:
+    token = _get_bearer_token(websocket)
+    if not token:
+        return None
+
+    payload = verify_access_token(token)
+    if payload is None:
+        return None
+
+    user_id = payload.get("sub")
+    if user_id is None:
+        return None
+
+    try:
+        return UUID(user_id)
+    except ValueError:
+        return None
 
 
 def _get_bearer_token(websocket: WebSocket) -> str | None:
@@ -14,6 +14,8 @@ from app.core.security import (
 )
 from app.models.user import User
 from app.schemas.token import TokenResponse
+from app.schemas.user import Principal
+from app.services.principal import get_principal
 from app.utils.user import get_user_by_id, get_user_by_email
 from app.db.database import get_async_session
 from app.exceptions.auth import InvalidCredentialsError, InactiveUserError
@@ -27,7 +29,7 @@ async def authenticate_user(
     user = await get_user_by_email(email, session)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return None
     return user
 
@@ -35,7 +37,12 @@ async def authenticate_user(
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     session: Annotated[AsyncSession, Depends(get_async_session)],
-) -> User:
+) -> Principal:
+    """The caller from the bearer token, via the principal cache.
+
+    Only the id and flags are loaded; routes that need the user's other
+    fields depend on ``get_current_user_record`` instead.
+    """
     payload = verify_access_token(token)
     if payload is None:
         raise InvalidCredentialsError()
@@ -49,23 +56,34 @@ async def get_current_user(
     except ValueError:
         raise InvalidCredentialsError()
 
-    user = await get_user_by_id(user_id, session)
+    principal = await get_principal(user_id, session)
 
-    if user is None:
+    if principal is None:
         raise InvalidCredentialsError()
 
-    return user
+    return principal
 
 
 def get_current_active_user(
-    current_user: Annotated[User, Depends(get_current_user)],
-) -> User:
+    current_user: Annotated[Principal, Depends(get_current_user)],
+) -> Principal:
     if not current_user.is_active:
         raise InactiveUserError()
     return current_user
 
 
-get_current_active_user_dependency = Annotated[User, Depends(get_current_active_user)]
+get_current_active_user_dependency = Annotated[Principal, Depends(get_current_active_user)]
+
+
+async def get_current_user_record(
+    current_user: Annotated[Principal, Depends(get_current_active_user)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+) -> User:
+    """The caller's full, current user row, for routes that need more than the principal."""
+    user = await get_user_by_id(current_user.id, session)
+    if user is None:
+        raise InvalidCredentialsError()
+    return user
 
 
 def create_token_for_user(user: User) -> TokenResponse:
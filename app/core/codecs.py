@@ -0,0 +1,88 @@
+"""Wire formats a WebSocket client can negotiate via ``Sec-WebSocket-Protocol``.
+
+Frames are built and published as JSON text. A codec turns that canonical
+frame into what its sockets receive, so a broadcast encodes each frame at
+most once per format in use, never once per socket.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install "real-time-chat-api[msgpack]"
+    msgpack = None
+
+
+class FrameCodec(ABC):
+    subprotocol: str
+    binary: bool
+
+    @abstractmethod
+    def encode(self, frame: str) -> str | bytes:
+        """The canonical JSON frame in this codec's wire format."""
+
+    @abstractmethod
+    def decode(self, data: str | bytes) -> Any:
+        """A received frame as plain Python data; raises ValueError if malformed."""
+
+
+class JSONCodec(FrameCodec):
+    subprotocol = "chat.json.v1"
+    binary = False
+
+    def encode(self, frame: str) -> str:
+        return frame
+
+    def decode(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgPackCodec(FrameCodec):
+    subprotocol = "chat.msgpack.v1"
+    binary = True
+
+    def encode(self, frame: str) -> bytes:
+        return msgpack.packb(json.loads(frame))
+
+    def decode(self, data: str | bytes) -> Any:
+        if isinstance(data, str):
+            raise ValueError("Expected a binary msgpack frame.")
+        return msgpack.unpackb(data)
+
+
+JSON_CODEC = JSONCodec()
+CODECS: dict[str, FrameCodec] = {JSON_CODEC.subprotocol: JSON_CODEC}
+if msgpack is not None:
+    CODECS[MsgPackCodec.subprotocol] = MsgPackCodec()
+
+
+def negotiate_codec(websocket: WebSocket) -> tuple[FrameCodec, str | None] | None:
+    """Pick the first offered subprotocol we support.
+
+    Clients that offer none get plain JSON, as before subprotocols existed.
+    Returns None when every offered subprotocol is unsupported.
+    """
+    offered = websocket.scope.get("subprotocols") or []
+    if not offered:
+        return JSON_CODEC, None
+    for subprotocol in offered:
+        codec = CODECS.get(subprotocol)
+        if codec is not None:
+            return codec, subprotocol
+    return None
+
+
+async def receive_frame(websocket: WebSocket, codec: FrameCodec) -> Any:
+    """Receive one client frame and decode it; raises ValueError if malformed."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+
+    data = message.get("bytes")
+    if data is None:
+        data = message.get("text")
+    return codec.decode(data)
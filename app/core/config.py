@@ -19,11 +19,44 @@ class Settings(BaseSettings):
     ALGORITHM: str 
     SECRET_KEY: str 
     ACCESS_TOKEN_EXPIRE_MINUTES: int 
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
 
     # Redis settings
     REDIS_HOST: str 
     REDIS_PORT: int 
 
+    # WebSocket settings
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0
+    WS_REPLAY_BUFFER_SIZE: int = 500
+    WS_REPLAY_BUFFER_TTL_SECONDS: int = 3600
+    WS_REPLAY_MAX_MESSAGES: int = 200
+    WS_SEND_RATE_PER_SECOND: float = 5.0
+    WS_SEND_BURST: int = 10
+    WS_USER_SEND_RATE_PER_SECOND: float = 10.0
+    WS_USER_SEND_BURST: int = 20
+    WS_TYPING_COALESCE_SECONDS: float = 3.0
+    WS_PRESENCE_TTL_SECONDS: int = 60
+    WS_HEARTBEAT_INTERVAL_SECONDS: float = 25.0
+    WS_HEARTBEAT_MAX_MISSED: int = 2
+    WS_DRAIN_WAVES: int = 5
+    WS_DRAIN_WAVE_INTERVAL_SECONDS: float = 1.0
+    WS_DRAIN_RECONNECT_MAX_DELAY_SECONDS: float = 10.0
+
+    # Message write batching
+    MESSAGE_BATCH_MAX_SIZE: int = 100
+    MESSAGE_BATCH_MAX_DELAY_MS: float = 5.0
+
+    # Inbox index
+    INBOX_CACHE_TTL_SECONDS: int = 3600
+
+    # Membership cache
+    MEMBERSHIP_CACHE_TTL_SECONDS: int = 600
+    MEMBERSHIP_LOCAL_TTL_SECONDS: float = 30.0
+    MEMBERSHIP_LOCAL_MAX_CONVERSATIONS: int = 10000
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -0,0 +1,89 @@
+import math
+import time
+from collections.abc import Callable
+
+from redis.exceptions import RedisError
+
+from app.core.redis import redis_client
+
+
+class TokenBucket:
+    """In-process token bucket for state owned by a single worker."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated_at = clock()
+
+    def acquire(self) -> float:
+        """Take one token; returns 0 on success, otherwise seconds to wait."""
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def refund(self) -> None:
+        """Return a token taken for an action that a later check refused."""
+        self._tokens = min(self.capacity, self._tokens + 1)
+
+
+# Refill and take atomically on the Redis clock so every worker sees one bucket.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated_at) * rate)
+
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return tostring(retry_after)
+"""
+
+
+class RedisTokenBucket:
+    """Token bucket shared by every worker through Redis, one bucket per key."""
+
+    def __init__(self, prefix: str, rate: float, capacity: int) -> None:
+        self.prefix = prefix
+        self.rate = rate
+        self.capacity = capacity
+        self._ttl = math.ceil(capacity / rate) + 1
+        self._script = redis_client.register_script(_TOKEN_BUCKET_LUA)
+
+    async def acquire(self, key: str) -> float:
+        """Take one token; returns 0 on success, otherwise seconds to wait.
+
+        Fails open: if Redis is unavailable the request is allowed, since the
+        per-connection bucket still bounds each socket.
+        """
+        try:
+            retry_after = await self._script(
+                keys=[f"{self.prefix}:{key}"],
+                args=[self.rate, self.capacity, self._ttl],
+            )
+        except (RedisError, OSError):
+            return 0.0
+        return float(retry_after)
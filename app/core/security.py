@@ -1,21 +1,93 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
+from collections.abc import Callable
+from typing import TypeVar
+import asyncio
 import re
+import time
 
 from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
+from app.exceptions.auth import PasswordHashingBusyError
 
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
 SPECIAL_CHARACTERS = r"[@#$%^&*!]"
 
+T = TypeVar("T")
 
-def get_hashed_password(password: str) -> str:
-    return pwd_context.hash(password)
+PASSWORD_HASH_LATENCY = Histogram(
+    "chat_password_hash_seconds",
+    "Time to hash or verify a password, including time queued for a worker.",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "chat_password_hash_rejected_total",
+    "Password hash or verify calls refused because the queue was full.",
+)
 
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+class PasswordHasherPool:
+    """Runs Argon2 on a small, bounded thread pool instead of the event loop.
+
+    argon2-cffi releases the GIL while hashing, so threads hash in parallel
+    and the loop keeps serving sockets. Calls beyond ``max_pending`` running
+    or queued are refused at once with ``PasswordHashingBusyError``, so a
+    login burst costs login latency, never chat delivery.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a free worker."""
+        return max(0, self.pending - self.workers)
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        if self.pending >= self.max_pending:
+            PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHashingBusyError()
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.pending += 1
+        future = self._executor.submit(func, *args)
+        # Released when the work itself ends, not when the caller gives up:
+        # a disconnected client's hash still occupies its thread.
+        future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._release, started)
+        )
+        return await asyncio.wrap_future(future)
+
+    def _release(self, started: float) -> None:
+        self.pending -= 1
+        PASSWORD_HASH_LATENCY.observe(time.perf_counter() - started)
+
+
+password_hasher = PasswordHasherPool(
+    settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING
+)
+
+# Read from the pool only when /metrics is scraped.
+Gauge(
+    "chat_password_hash_queue_depth",
+    "Password hash or verify calls waiting for a worker.",
+    callback=lambda: password_hasher.queue_depth,
+)
+
+
+async def get_hashed_password(password: str) -> str:
+    return await password_hasher.run(pwd_context.hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(pwd_context.verify, plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
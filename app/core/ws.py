@@ -1,87 +1,645 @@
 import asyncio
-import json
-from typing import Dict, Set
+import math
+import random
+import time
+from bisect import bisect_left
 from uuid import UUID
 
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect, status
+from redis.exceptions import RedisError
 
+from app.core.codecs import JSON_CODEC, FrameCodec, receive_frame
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
 from app.core.redis import redis_client
+from app.schemas.ws import WSPingOut, WSReconnectOut
+
+CHANNEL_PREFIX = "conversation:"
+REPLAY_SCAN_CHUNK = 50
+HEARTBEAT_WHEEL_SLOTS = 16
+CONNECTION_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 1000)
+PING_FRAME = WSPingOut().model_dump_json()
+
+BROKER_MESSAGES = Counter(
+    "chat_ws_broker_messages_total",
+    "Pub/sub messages received from Redis by this worker.",
+)
+FRAMES_DELIVERED = Counter(
+    "chat_ws_frames_delivered_total",
+    "Frames written to local sockets.",
+)
+BROADCAST_FAILURES = Counter(
+    "chat_ws_broadcast_failures_total",
+    "Connections evicted while delivering frames, by reason.",
+    labelnames=("reason",),
+)
+DELIVERY_LATENCY = Histogram(
+    "chat_ws_delivery_latency_seconds",
+    "Time from a frame being queued for a socket to being written to it.",
+)
+PUBLISH_LATENCY = Histogram(
+    "chat_ws_publish_latency_seconds",
+    "Redis round-trip to publish a frame to a conversation.",
+)
+
+
+class ClientConnection:
+    """A local socket with its own bounded outbound queue and writer task.
+
+    Frames are pre-encoded JSON text, converted by the connection's codec
+    into the negotiated wire format. Producers never await the socket: they
+    enqueue and move on. A connection whose queue overflows or whose send
+    times out is closed with a policy violation so one stalled client cannot
+    hold up anyone else.
+    """
+
+    def __init__(
+        self,
+        manager: "ConnectionManager",
+        websocket: WebSocket,
+        max_queue_size: int,
+        send_timeout: float,
+        codec: FrameCodec = JSON_CODEC,
+    ) -> None:
+        self.websocket = websocket
+        self.codec = codec
+        self.conversation_ids: set[UUID] = set()
+        self.closed = False
+        self.wheel_slot = 0
+        self.missed_heartbeats = 0
+        self.seen = False
+        self._manager = manager
+        self._send_timeout = send_timeout
+        # Items are (frame, enqueued_at) so the writer can observe delivery latency.
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._held: list[str] | None = None
+        self._send_payload = websocket.send_bytes if codec.binary else websocket.send_text
+        self._writer_task = asyncio.create_task(self._write_loop())
+
+    def send(self, frame: str, payload: str | bytes | None = None) -> bool:
+        """Queue a frame for delivery; returns False if the queue is full.
+
+        ``payload`` is the frame already encoded with this connection's codec,
+        when the caller shares one encoding across many sockets.
+        """
+        if self.closed:
+            return False
+        if self._held is not None:
+            if len(self._held) >= self._queue.maxsize:
+                return False
+            self._held.append(frame)
+            return True
+        if payload is None:
+            payload = self.codec.encode(frame)
+        try:
+            self._queue.put_nowait((payload, time.monotonic()))
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def receive(self):
+        """Next decoded client frame; any inbound frame counts as a heartbeat."""
+        try:
+            return await receive_frame(self.websocket, self.codec)
+        finally:
+            self.mark_alive()
+
+    def mark_alive(self) -> None:
+        self.seen = True
+
+    def hold(self) -> None:
+        """Park live frames until ``release`` so a replay can go out first."""
+        if self._held is None:
+            self._held = []
+
+    def release(self, replay_frames: list[str] = ()) -> None:
+        """Send replayed frames, then the parked live frames they don't repeat.
+
+        Like live frames, they never wait for room: a client that cannot take
+        the whole backlog is evicted.
+        """
+        held, self._held = self._held or [], None
+        replayed = set(replay_frames)
+        backlog = [*replay_frames, *(frame for frame in held if frame not in replayed)]
+        for frame in backlog:
+            if not self.send(frame):
+                self._manager.evict(self, reason="queue_full")
+                return
+
+    async def flush(self) -> None:
+        """Wait until every queued frame has been written."""
+        await self._queue.join()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stop(self) -> None:
+        self.closed = True
+        if self._writer_task is not asyncio.current_task():
+            self._writer_task.cancel()
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                payload, enqueued_at = await self._queue.get()
+                try:
+                    await asyncio.wait_for(self._send_payload(payload), self._send_timeout)
+                except asyncio.CancelledError:
+                    raise
+                except TimeoutError:
+                    self._manager.evict(self, reason="send_timeout")
+                    return
+                except Exception:
+                    self._manager.evict(self, reason="send_error")
+                    return
+                finally:
+                    self._queue.task_done()
+                FRAMES_DELIVERED.inc()
+                DELIVERY_LATENCY.observe(time.monotonic() - enqueued_at)
+        except asyncio.CancelledError:
+            pass
 
 
 class ConnectionManager:
-    def __init__(self) -> None:
-        self._active_connections: Dict[UUID, Set[WebSocket]] = {}
-        self._redis_tasks: Dict[UUID, asyncio.Task] = {}
-        self._redis_pubsubs = {}
-        self._lock = asyncio.Lock()
-
-    async def connect(self, conversation_id: UUID, websocket: WebSocket) -> None:
-        async with self._lock:
-            connections = self._active_connections.setdefault(conversation_id, set())
-            connections.add(websocket)
-            if conversation_id not in self._redis_tasks:
-                await self._start_redis_listener(conversation_id)
-
-    async def disconnect(self, conversation_id: UUID, websocket: WebSocket) -> None:
-        async with self._lock:
+    """Tracks local sockets per conversation and relays Redis pub/sub to them.
+
+    A connection may be subscribed to any number of conversations. Every
+    worker holds a single pub/sub connection and one reader task that
+    dispatches incoming messages to the matching local connections.
+
+    Liveness is checked by one reaper task driving a timer wheel: each
+    connection sits in a slot that is visited once per heartbeat interval,
+    so a tick costs O(connections / slots) rather than a task per socket.
+
+    The local registry is only touched by code that never awaits, so it needs
+    no lock. Redis SUBSCRIBE/UNSUBSCRIBE is left to a single sync task that
+    reconciles the subscribed channels with the registry, batching every
+    change made since its last round into one command each.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int | None = None,
+        send_timeout: float | None = None,
+        heartbeat_interval: float | None = None,
+        max_missed_heartbeats: int | None = None,
+    ) -> None:
+        self._active_connections: dict[UUID, set[ClientConnection]] = {}
+        self._connections: set[ClientConnection] = set()
+        self._subscribed: set[UUID] = set()
+        self._unsubscribing: set[UUID] = set()
+        self._pubsub = None
+        self._listener_task: asyncio.Task | None = None
+        self._sync_task: asyncio.Task | None = None
+        self._sync_event = asyncio.Event()
+        self._sync_waiters: list[asyncio.Future] = []
+        self._max_queue_size = max_queue_size or settings.WS_SEND_QUEUE_SIZE
+        self._send_timeout = send_timeout or settings.WS_SEND_TIMEOUT_SECONDS
+        self._heartbeat_interval = heartbeat_interval or settings.WS_HEARTBEAT_INTERVAL_SECONDS
+        self._max_missed_heartbeats = (
+            max_missed_heartbeats
+            if max_missed_heartbeats is not None
+            else settings.WS_HEARTBEAT_MAX_MISSED
+        )
+        self._wheel: list[set[ClientConnection]] = [
+            set() for _ in range(HEARTBEAT_WHEEL_SLOTS)
+        ]
+        self._wheel_position = 0
+        self._reaper_task: asyncio.Task | None = None
+        self._drain_task: asyncio.Task | None = None
+        self._torn_down = False
+        self._close_tasks: set[asyncio.Task] = set()
+        self.draining = False
+
+    def register(
+        self, websocket: WebSocket, codec: FrameCodec = JSON_CODEC
+    ) -> ClientConnection:
+        connection = ClientConnection(
+            self,
+            websocket,
+            max_queue_size=self._max_queue_size,
+            send_timeout=self._send_timeout,
+            codec=codec,
+        )
+        self._connections.add(connection)
+
+        # The current slot was just visited, so the first check is a full interval away.
+        connection.wheel_slot = self._wheel_position
+        self._wheel[connection.wheel_slot].add(connection)
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+        return connection
+
+    async def connect(self, conversation_id: UUID, websocket: WebSocket) -> ClientConnection:
+        connection = self.register(websocket)
+        await self.subscribe(connection, conversation_id)
+        return connection
+
+    async def subscribe(self, connection: ClientConnection, *conversation_ids: UUID) -> None:
+        """Attach a connection and wait until Redis delivers its channels.
+
+        Raises WebSocketDisconnect (1012) once a drain has torn down pub/sub.
+        """
+        if self._torn_down:
+            raise WebSocketDisconnect(status.WS_1012_SERVICE_RESTART)
+        for conversation_id in conversation_ids:
+            self._active_connections.setdefault(conversation_id, set()).add(connection)
+            connection.conversation_ids.add(conversation_id)
+
+        if any(
+            conversation_id not in self._subscribed or conversation_id in self._unsubscribing
+            for conversation_id in conversation_ids
+        ):
+            await self._request_sync()
+
+    async def unsubscribe(self, connection: ClientConnection, *conversation_ids: UUID) -> None:
+        emptied = False
+        for conversation_id in conversation_ids:
+            connection.conversation_ids.discard(conversation_id)
             connections = self._active_connections.get(conversation_id)
-            if connections and websocket in connections:
-                connections.remove(websocket)
+            if connections is None:
+                continue
 
+            connections.discard(connection)
             if not connections:
-                self._active_connections.pop(conversation_id, None)
-                await self._stop_redis_listener(conversation_id)
+                del self._active_connections[conversation_id]
+                emptied = True
+
+        if emptied:
+            # Nobody needs to wait for an UNSUBSCRIBE; stray messages find no sockets.
+            self._wake_sync()
 
-    async def broadcast(self, conversation_id: UUID, payload) -> None:
-        if isinstance(payload, str):
-            payload = json.loads(payload)
+    async def disconnect(self, connection: ClientConnection) -> None:
+        connection.stop()
+        self._connections.discard(connection)
+        self._wheel[connection.wheel_slot].discard(connection)
+        await self.unsubscribe(connection, *list(connection.conversation_ids))
 
-        connections = list(self._active_connections.get(conversation_id, set()))
-        if not connections:
+    def evict(
+        self,
+        connection: ClientConnection,
+        reason: str,
+        code: int = status.WS_1008_POLICY_VIOLATION,
+    ) -> None:
+        """Drop a slow, broken or silent consumer without blocking the caller."""
+        if connection.closed:
             return
+        BROADCAST_FAILURES.labels(reason).inc()
+        connection.stop()
+        # Referenced until done so the loop cannot collect it and drain can wait on it.
+        task = asyncio.create_task(self._close(connection, code))
+        self._close_tasks.add(task)
+        task.add_done_callback(self._close_tasks.discard)
 
-        for websocket in connections:
-            try:
-                await websocket.send_json(payload)
-            except Exception:
-                await self.disconnect(conversation_id, websocket)
+    async def drain(self) -> None:
+        """Hand this worker's sockets off to other workers without a thundering herd.
+
+        New handshakes are refused from here on. Every client is told to
+        reconnect after its own random delay, sockets are closed in
+        WS_DRAIN_WAVES waves, and the Redis pub/sub connection is torn down.
+        Safe to call more than once; later calls wait for the first drain.
+        """
+        if self._drain_task is None:
+            self.draining = True
+            self._drain_task = asyncio.create_task(self._drain())
+        await asyncio.shield(self._drain_task)
+
+    async def publish(
+        self, conversation_id: UUID, frame: str, message_id: UUID | None = None
+    ) -> None:
+        """Fan an encoded frame out to every worker holding the conversation.
 
-    async def _start_redis_listener(self, conversation_id: UUID) -> None:
+        Frames for persisted messages are also appended to the conversation's
+        capped replay stream in the same round-trip.
+        """
         channel = self._channel_name(conversation_id)
-        pubsub = redis_client.pubsub()
-        await pubsub.subscribe(channel)
-        self._redis_pubsubs[conversation_id] = pubsub
-        self._redis_tasks[conversation_id] = asyncio.create_task(
-            self._redis_listen_loop(conversation_id, pubsub)
-        )
+        started_at = time.monotonic()
+        if message_id is None:
+            await redis_client.publish(channel, frame)
+        else:
+            stream = self._stream_name(conversation_id)
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.xadd(
+                    stream,
+                    {"message_id": str(message_id), "frame": frame},
+                    maxlen=settings.WS_REPLAY_BUFFER_SIZE,
+                    approximate=True,
+                )
+                pipe.expire(stream, settings.WS_REPLAY_BUFFER_TTL_SECONDS)
+                pipe.publish(channel, frame)
+                await pipe.execute()
+        PUBLISH_LATENCY.observe(time.monotonic() - started_at)
+
+    async def publish_many(self, frames: dict[UUID, str]) -> None:
+        """Publish one frame per conversation in a single pipelined round-trip."""
+        if not frames:
+            return
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for conversation_id, frame in frames.items():
+                pipe.publish(self._channel_name(conversation_id), frame)
+            await pipe.execute()
+
+    async def replay(
+        self, conversation_id: UUID, last_message_id: UUID, limit: int
+    ) -> list[str] | None:
+        """Frames published after ``last_message_id``, oldest first.
+
+        Scans the replay stream backwards, so the cost grows with the gap
+        rather than the buffer. Returns None when the cursor is not among the
+        last ``limit`` entries, i.e. the buffer has rolled over or the gap is
+        too large to replay.
+        """
+        stream = self._stream_name(conversation_id)
+        target = str(last_message_id)
+        frames: list[str] = []
+        upper = "+"
+        while True:
+            entries = await redis_client.xrevrange(
+                stream, max=upper, min="-", count=REPLAY_SCAN_CHUNK
+            )
+            for entry_id, fields in entries:
+                if fields.get("message_id") == target:
+                    frames.reverse()
+                    return frames
+                frames.append(fields["frame"])
+                if len(frames) > limit:
+                    return None
+            if len(entries) < REPLAY_SCAN_CHUNK:
+                return None
+            upper = f"({entries[-1][0]}"
 
-    async def _stop_redis_listener(self, conversation_id: UUID) -> None:
-        task = self._redis_tasks.pop(conversation_id, None)
-        pubsub = self._redis_pubsubs.pop(conversation_id, None)
+    async def broadcast(self, conversation_id: UUID, frame: str) -> None:
+        # One encoding per wire format, shared by every socket that speaks it.
+        payloads: dict[FrameCodec, str | bytes] = {}
+        for connection in list(self._active_connections.get(conversation_id, ())):
+            payload = payloads.get(connection.codec)
+            if payload is None:
+                payload = payloads[connection.codec] = connection.codec.encode(frame)
+            if not connection.send(frame, payload):
+                self.evict(connection, reason="queue_full")
 
-        if task:
+    async def _drain(self) -> None:
+        connections = list(self._connections)
+        random.shuffle(connections)
+        max_delay = settings.WS_DRAIN_RECONNECT_MAX_DELAY_SECONDS
+        for connection in connections:
+            connection.send(
+                WSReconnectOut(retry_after=round(random.uniform(0, max_delay), 3)).model_dump_json()
+            )
+
+        wave_size = max(1, math.ceil(len(connections) / settings.WS_DRAIN_WAVES))
+        for start in range(0, len(connections), wave_size):
+            if start:
+                await asyncio.sleep(settings.WS_DRAIN_WAVE_INTERVAL_SECONDS)
+            await asyncio.gather(
+                *(
+                    self._close_gracefully(connection, status.WS_1012_SERVICE_RESTART)
+                    for connection in connections[start:start + wave_size]
+                )
+            )
+
+        await self._teardown()
+
+    async def _close_gracefully(self, connection: ClientConnection, code: int) -> None:
+        if connection.closed:
+            return
+        try:
+            await asyncio.wait_for(connection.flush(), self._send_timeout)
+        except TimeoutError:
+            pass
+        connection.stop()
+        await self._close(connection, code)
+
+    async def _teardown(self) -> None:
+        while self._close_tasks:
+            # Discard here too: gather over finished tasks need not yield to their callbacks.
+            closing = list(self._close_tasks)
+            await asyncio.gather(*closing, return_exceptions=True)
+            self._close_tasks.difference_update(closing)
+        self._torn_down = True
+        tasks = [
+            task
+            for task in (self._reaper_task, self._listener_task, self._sync_task)
+            if task is not None
+        ]
+        for task in tasks:
             task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Subscribers still waiting for a sync would otherwise wait forever.
+        waiters, self._sync_waiters = self._sync_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_exception(WebSocketDisconnect(status.WS_1012_SERVICE_RESTART))
+        if self._pubsub is not None:
             try:
-                await task
-            except asyncio.CancelledError:
+                await self._pubsub.aclose()
+            except (RedisError, OSError):
                 pass
+            self._pubsub = None
+        self._subscribed.clear()
+
+    async def _close(self, connection: ClientConnection, code: int) -> None:
+        await self.disconnect(connection)
+        try:
+            await asyncio.wait_for(connection.websocket.close(code=code), self._send_timeout)
+        except Exception:
+            pass
+
+    async def _reap_loop(self) -> None:
+        tick = self._heartbeat_interval / len(self._wheel)
+        try:
+            while self._connections:
+                await asyncio.sleep(tick)
+                self._wheel_position = (self._wheel_position + 1) % len(self._wheel)
+
+                pings: dict[FrameCodec, str | bytes] = {}
+                for connection in list(self._wheel[self._wheel_position]):
+                    self._check_heartbeat(connection, pings)
+        except asyncio.CancelledError:
+            pass
+
+    def _check_heartbeat(
+        self, connection: ClientConnection, pings: dict[FrameCodec, str | bytes]
+    ) -> None:
+        """Ping a connection that was silent for an interval; drop it after too many."""
+        if connection.seen:
+            connection.seen = False
+            connection.missed_heartbeats = 0
+            return
+
+        if connection.missed_heartbeats >= self._max_missed_heartbeats:
+            self.evict(connection, reason="heartbeat", code=status.WS_1001_GOING_AWAY)
+            return
+
+        connection.missed_heartbeats += 1
+        payload = pings.get(connection.codec)
+        if payload is None:
+            payload = pings[connection.codec] = connection.codec.encode(PING_FRAME)
+        if not connection.send(PING_FRAME, payload):
+            self.evict(connection, reason="queue_full")
+
+    def _request_sync(self) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._sync_waiters.append(future)
+        self._wake_sync()
+        return future
+
+    def _wake_sync(self) -> None:
+        if self._torn_down:
+            return
+        self._sync_event.set()
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def _sync_loop(self) -> None:
+        waiters: list[asyncio.Future] = []
+        try:
+            while True:
+                await self._sync_event.wait()
+                self._sync_event.clear()
+                waiters, self._sync_waiters = self._sync_waiters, []
+
+                wanted = set(self._active_connections)
+                to_subscribe = wanted - self._subscribed
+                to_unsubscribe = self._subscribed - wanted
+                try:
+                    if self._pubsub is None:
+                        self._pubsub = redis_client.pubsub()
+                    if to_subscribe:
+                        await self._pubsub.subscribe(*map(self._channel_name, to_subscribe))
+                        self._subscribed |= to_subscribe
+                    if to_unsubscribe:
+                        self._unsubscribing = to_unsubscribe
+                        await self._pubsub.unsubscribe(*map(self._channel_name, to_unsubscribe))
+                        self._subscribed -= to_unsubscribe
+                except Exception as exc:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(exc)
+                    continue
+                finally:
+                    self._unsubscribing = set()
+
+                if self._subscribed != set(self._active_connections):
+                    # The registry moved while we were awaiting Redis; go again.
+                    self._sync_event.set()
 
-        if pubsub:
-            channel = self._channel_name(conversation_id)
-            await pubsub.unsubscribe(channel)
-            await pubsub.close()
+                if self._subscribed and (
+                    self._listener_task is None or self._listener_task.done()
+                ):
+                    self._listener_task = asyncio.create_task(self._redis_listen_loop())
 
-    async def _redis_listen_loop(self, conversation_id: UUID, pubsub) -> None:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+        except asyncio.CancelledError:
+            # Hand the round's waiters back so teardown can fail them.
+            self._sync_waiters.extend(waiters)
+            raise
+
+    async def _redis_listen_loop(self) -> None:
+        pubsub = self._pubsub
         try:
-            async for message in pubsub.listen():
-                if message.get("type") != "message":
+            while True:
+                try:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                except (RedisError, OSError):
+                    # redis-py reconnects and resubscribes on the next read.
+                    await asyncio.sleep(1.0)
+                    continue
+
+                if message is None or message.get("type") != "message":
+                    continue
+
+                conversation_id = self._conversation_id_from_channel(message.get("channel"))
+                if conversation_id is None:
                     continue
+                BROKER_MESSAGES.inc()
                 await self.broadcast(conversation_id, message.get("data"))
         except asyncio.CancelledError:
             pass
 
+    @property
+    def connection_count(self) -> int:
+        return len(self._connections)
+
+    @property
+    def conversation_count(self) -> int:
+        return len(self._active_connections)
+
+    @property
+    def subscription_count(self) -> int:
+        return len(self._subscribed)
+
+    @property
+    def listener_count(self) -> int:
+        return int(self._listener_task is not None and not self._listener_task.done())
+
+    def conversations_by_connection_count(self) -> dict[tuple[str], int]:
+        """Active conversations counted per bucket of local connections, e.g. ``("3-5",)``."""
+        labels = []
+        lower = 1
+        for upper in CONNECTION_COUNT_BUCKETS:
+            labels.append(str(upper) if upper == lower else f"{lower}-{upper}")
+            lower = upper + 1
+        labels.append(f"{lower}+")
+        counts = [0] * len(labels)
+        for connections in self._active_connections.values():
+            counts[bisect_left(CONNECTION_COUNT_BUCKETS, len(connections))] += 1
+        return {(label,): count for label, count in zip(labels, counts)}
+
+    def queue_depths(self):
+        return (connection.queue_depth for connection in self._connections)
+
     def _channel_name(self, conversation_id: UUID) -> str:
-        return f"conversation:{conversation_id}"
+        return f"{CHANNEL_PREFIX}{conversation_id}"
+
+    def _stream_name(self, conversation_id: UUID) -> str:
+        return f"{CHANNEL_PREFIX}{conversation_id}:events"
+
+    def _conversation_id_from_channel(self, channel: str | None) -> UUID | None:
+        if not channel or not channel.startswith(CHANNEL_PREFIX):
+            return None
+        try:
+            return UUID(channel[len(CHANNEL_PREFIX):])
+        except ValueError:
+            return None
 
 
 ws_manager = ConnectionManager()
+
+# Read from the manager only when /metrics is scraped.
+Gauge(
+    "chat_ws_connections",
+    "Open WebSocket connections on this worker.",
+    callback=lambda: ws_manager.connection_count,
+)
+Gauge(
+    "chat_ws_conversations",
+    "Conversations with at least one local connection.",
+    callback=lambda: ws_manager.conversation_count,
+)
+Gauge(
+    "chat_ws_redis_subscriptions",
+    "Conversation channels this worker is subscribed to in Redis.",
+    callback=lambda: ws_manager.subscription_count,
+)
+Gauge(
+    "chat_ws_redis_listener_tasks",
+    "Running Redis pub/sub reader tasks on this worker.",
+    callback=lambda: ws_manager.listener_count,
+)
+Gauge(
+    "chat_ws_send_queue_frames",
+    "Frames waiting in outbound socket queues.",
+    callback=lambda: sum(ws_manager.queue_depths()),
+)
+Gauge(
+    "chat_ws_conversation_connections",
+    "Active conversations by their number of local connections.",
+    labelnames=("connections",),
+    callback=ws_manager.conversations_by_connection_count,
+)
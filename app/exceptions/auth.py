@@ -32,3 +32,13 @@ class InactiveUserError(HTTPException):
             detail=detail,
         )
 
+
+class PasswordHashingBusyError(HTTPException):
+    """Raised when too many password hashes are already queued on this worker."""
+
+    def __init__(self, detail: str = "Too many sign-in attempts in progress, retry shortly"):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": "1"},
+        )
@@ -1,13 +1,69 @@
+import asyncio
+import signal
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, BackgroundTasks
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1 import user, auth, chat
 from app.core.config import settings
+from app.core.metrics import REGISTRY
+from app.core.ws import ws_manager
+from app.services.membership import listen_for_invalidations
+
+
+def _drain_before_sigterm() -> None:
+    """Drain WebSockets first when SIGTERM arrives, then let the server stop.
+
+    uvicorn closes every socket as soon as it begins shutting down, before
+    lifespan shutdown runs, so the drain has to start from the signal itself.
+    """
+    loop = asyncio.get_running_loop()
+    previous = signal.getsignal(signal.SIGTERM)
+    chained = False
+
+    def chain(*_) -> None:
+        nonlocal chained
+        if chained:
+            return
+        chained = True
+        signal.signal(signal.SIGTERM, previous)
+        if callable(previous):
+            previous(signal.SIGTERM, None)
+        else:
+            signal.raise_signal(signal.SIGTERM)
+
+    def start_drain() -> None:
+        loop.create_task(ws_manager.drain()).add_done_callback(chain)
+
+    def handle_sigterm(signum, frame) -> None:
+        if ws_manager.draining:
+            # A second SIGTERM means stop waiting.
+            chain()
+        else:
+            loop.call_soon_threadsafe(start_drain)
+
+    try:
+        signal.signal(signal.SIGTERM, handle_sigterm)
+    except ValueError:
+        pass  # not the main thread, e.g. an embedded server
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _drain_before_sigterm()
+    invalidations = asyncio.create_task(listen_for_invalidations())
+    yield
+    await ws_manager.drain()
+    invalidations.cancel()
+
 
 app = FastAPI(
     title="Real Time Chat Application API",
     description="API for a real-time chat application built with FastAPI.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 api_prefix_v1 = f"{settings.API_PREFIX}{settings.API_V1}"
@@ -28,6 +84,13 @@ app.add_middleware(
 async def read_root():
     return {"Hello": "World"}
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint for this worker."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 def write_notification(email: str, message: str):
     import os
     os.makedirs("logs", exist_ok=True)
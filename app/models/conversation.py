@@ -1,5 +1,7 @@
 import uuid
-from sqlalchemy import Column, Boolean, DateTime, ForeignKey, String, Text
+from sqlalchemy import (
+    Column, Boolean, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint, text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -9,17 +11,36 @@ from app.db.database import Base
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Serves ON DELETE SET NULL when a user is deleted; most rows have no creator.
+        Index(
+            "ix_conversations_created_by",
+            "created_by",
+            postgresql_where=text("created_by IS NOT NULL"),
+        ),
+        # One row per pair of users: DM get-or-create is a single unique lookup.
+        UniqueConstraint("direct_key", name="uq_conversations_direct_key"),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     is_group = Column(Boolean, server_default="FALSE", nullable=False)
     name = Column(String(120), nullable=True)
     description = Column(Text, nullable=True)
     avatar_url = Column(String(255), nullable=True)
+    # "<lower user id>:<higher user id>" for one-to-one conversations, else NULL.
+    direct_key = Column(String(73), nullable=True)
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True), default=func.now(), onupdate=func.now(), nullable=False
     )
+    # Summary maintained on write (see services.conversation.record_new_messages),
+    # so the inbox reads it instead of recomputing it per conversation.
+    last_message_id = Column(UUID(as_uuid=True), nullable=True)
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    last_message_preview = Column(String(200), nullable=True)
+    message_count = Column(Integer, server_default="0", default=0, nullable=False)
+    member_count = Column(Integer, server_default="0", default=0, nullable=False)
 
     members = relationship("ConversationMember", back_populates="conversation")
     messages = relationship("Message", back_populates="conversation")
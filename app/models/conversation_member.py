@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, DateTime, ForeignKey, String, UniqueConstraint
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -10,16 +10,30 @@ from app.db.database import Base
 class ConversationMember(Base):
     __tablename__ = "conversation_members"
     __table_args__ = (
+        # Also serves lookups by conversation_id alone (members, counts).
         UniqueConstraint("conversation_id", "user_id", name="uq_conversation_member"),
+        # A user's conversations: inbox, user socket subscriptions, DM lookup.
+        Index("ix_conversation_members_user_id_conversation_id", "user_id", "conversation_id"),
+        # Serves ON DELETE SET NULL when a message is deleted.
+        Index(
+            "ix_conversation_members_last_read_message_id",
+            "last_read_message_id",
+            postgresql_where=text("last_read_message_id IS NOT NULL"),
+        ),
     )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     conversation_id = Column(
         UUID(as_uuid=True), ForeignKey("conversations.id", ondelete="CASCADE")
     )
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
     role = Column(String(20), server_default="member", nullable=False)
     joined_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Read cursor: the newest message this member has read, and its created_at.
+    last_read_message_id = Column(
+        UUID(as_uuid=True), ForeignKey("messages.id", ondelete="SET NULL"), nullable=True
+    )
+    last_read_at = Column(DateTime(timezone=True), nullable=True)
 
     conversation = relationship("Conversation", back_populates="members")
     user = relationship("User")  # assumes you already have User model
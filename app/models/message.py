@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Boolean, ForeignKey, Text, DateTime
+from sqlalchemy import Column, Boolean, ForeignKey, Index, Text, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -9,6 +9,12 @@ from app.db.database import Base
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination: WHERE conversation_id = ? ORDER BY created_at, id.
+        Index("ix_messages_conversation_id_created_at_id", "conversation_id", "created_at", "id"),
+        # Serves ON DELETE CASCADE when a user is deleted.
+        Index("ix_messages_sender_id", "sender_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     conversation_id = Column(
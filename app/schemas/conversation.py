@@ -36,6 +36,10 @@ class AddMemberRequest(BaseModel):
     user_id: UUID
 
 
+class BulkAddMembersRequest(BaseModel):
+    user_ids: list[UUID] = Field(..., min_length=1, max_length=5000)
+
+
 class UpdateMemberRoleRequest(BaseModel):
     role: str = Field(..., pattern="^(admin|member)$")
 
@@ -46,6 +50,26 @@ class GroupMemberResponse(BaseModel):
     joined_at: datetime
 
 
+class MemberPresenceResponse(BaseModel):
+    user_id: UUID
+    status: str = Field(..., description="online, away or offline")
+
+
+class ReadCursorRequest(BaseModel):
+    message_id: UUID | None = Field(
+        None, description="Last message read; defaults to the newest message"
+    )
+
+
+class ReadCursorResponse(BaseModel):
+    conversation_id: UUID
+    user_id: UUID
+    last_read_message_id: UUID | None
+    last_read_at: datetime | None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class ConversationListItem(BaseModel):
     id: UUID
     is_group: bool
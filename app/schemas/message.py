@@ -12,7 +12,10 @@ class MessageResponse(BaseModel):
     conversation_id: UUID
     sender_id: UUID
     content: str
-    is_read: bool
+    is_read: bool = Field(
+        deprecated="Never updated; compare the message with the member's read cursor instead.",
+        description="Always false. Read state is the member's last_read_message_id.",
+    )
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
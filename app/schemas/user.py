@@ -18,6 +18,16 @@ class UserUpdate(BaseModel):
     )
 
 
+class Principal(BaseModel):
+    """The authenticated caller: the user fields authorization needs."""
+
+    id: UUID
+    is_active: bool
+    is_superuser: bool
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class UserResponse(BaseModel):
     id: UUID = Field(..., description="Unique identifier for the user")
     email: EmailStr = Field(..., description="The user's email address")
@@ -1,18 +1,102 @@
-from pydantic import BaseModel, Field
-from typing import Literal
+from datetime import datetime
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Annotated, Literal
+from uuid import UUID
 from app.schemas.message import MessageResponse
 
 
 class WSMessageIn(BaseModel):
     type: Literal["message.send"] = Field(..., description="Client message type")
+    conversation_id: UUID | None = Field(
+        None, description="Target conversation, required on the user-level socket"
+    )
     content: str = Field(..., min_length=1, max_length=5000)
 
 
+class WSSubscribeIn(BaseModel):
+    type: Literal["subscribe"]
+    conversation_id: UUID
+    last_message_id: UUID | None = Field(
+        None, description="Replay messages published after this one"
+    )
+
+
+class WSUnsubscribeIn(BaseModel):
+    type: Literal["unsubscribe"]
+    conversation_id: UUID
+
+
+class WSTypingIn(BaseModel):
+    type: Literal["typing.start", "typing.stop"]
+    conversation_id: UUID | None = Field(
+        None, description="Target conversation, required on the user-level socket"
+    )
+
+
+class WSPresenceIn(BaseModel):
+    type: Literal["presence.online", "presence.away"]
+
+
+class WSPongIn(BaseModel):
+    type: Literal["pong"]
+
+
+WSClientFrame = Annotated[
+    WSMessageIn | WSSubscribeIn | WSUnsubscribeIn | WSTypingIn | WSPresenceIn | WSPongIn,
+    Field(discriminator="type"),
+]
+ws_client_frame_adapter = TypeAdapter(WSClientFrame)
+
+
 class WSMessageOut(BaseModel):
     type: Literal["message.new"] = "message.new"
+    conversation_id: UUID
     message: MessageResponse
 
 
+class WSTypingOut(BaseModel):
+    type: Literal["typing.start", "typing.stop"]
+    conversation_id: UUID
+    user_id: UUID
+
+
+class WSPresenceOut(BaseModel):
+    type: Literal["presence.online", "presence.away"]
+    conversation_id: UUID
+    user_id: UUID
+
+
+class WSSubscriptionOut(BaseModel):
+    type: Literal["subscribed", "unsubscribed"]
+    conversation_id: UUID
+
+
+class WSReadOut(BaseModel):
+    type: Literal["read"] = "read"
+    conversation_id: UUID
+    user_id: UUID
+    last_read_message_id: UUID | None
+    last_read_at: datetime | None
+
+
+class WSPingOut(BaseModel):
+    type: Literal["ping"] = "ping"
+
+
+class WSReconnectOut(BaseModel):
+    type: Literal["reconnect"] = "reconnect"
+    retry_after: float = Field(..., description="Seconds to wait before reconnecting")
+
+
+class WSReplayTruncatedOut(BaseModel):
+    type: Literal["replay.truncated"] = "replay.truncated"
+    conversation_id: UUID
+
+
 class WSErrorOut(BaseModel):
     type: Literal["error"] = "error"
+    conversation_id: UUID | None = None
     detail: str
+    retry_after: float | None = Field(
+        None, description="Seconds to wait before retrying a rate-limited frame"
+    )
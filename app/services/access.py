@@ -0,0 +1,21 @@
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.membership import get_cached_membership
+from app.services.principal import get_principal
+
+
+async def can_access_conversation(
+    user_id: UUID, conversation_id: UUID, session: AsyncSession
+) -> bool:
+    """Whether an active user belongs to the conversation.
+
+    Membership comes from the shared membership cache and the active flag
+    from the principal cache, so a warm check costs no query.
+    """
+    membership = await get_cached_membership(conversation_id, user_id, session)
+    if membership.role is None:
+        return False
+    principal = await get_principal(user_id, session)
+    return principal is not None and principal.is_active
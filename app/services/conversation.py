@@ -1,15 +1,21 @@
+from collections.abc import Iterable
 from uuid import UUID
-from sqlalchemy import and_, func, select
+from sqlalchemy import bindparam, case, func, insert, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.util import identity_key
 
 from app.models.conversation import Conversation
 from app.models.conversation_member import ConversationMember
 from app.models.message import Message
+from app.services import inbox, membership as membership_cache
 
 ROLE_OWNER = "owner"
 ROLE_ADMIN = "admin"
 ROLE_MEMBER = "member"
 
+LAST_MESSAGE_PREVIEW_LENGTH = 200
+
 
 async def get_conversation_by_id(conversation_id: UUID, session: AsyncSession) -> Conversation | None:
     result = await session.execute(
@@ -32,17 +38,15 @@ async def get_membership(
 async def is_user_in_conversation(
     conversation_id: UUID, user_id: UUID, session: AsyncSession
 ) -> bool:
-    membership = await get_membership(conversation_id, user_id, session)
-    return membership is not None
+    membership = await membership_cache.get_cached_membership(conversation_id, user_id, session)
+    return membership.role is not None
 
 
-async def get_conversation_member_count(conversation_id: UUID, session: AsyncSession) -> int:
+async def list_user_conversation_ids(user_id: UUID, session: AsyncSession) -> list[UUID]:
     result = await session.execute(
-        select(func.count(ConversationMember.id)).where(
-            ConversationMember.conversation_id == conversation_id
-        )
+        select(ConversationMember.conversation_id).where(ConversationMember.user_id == user_id)
     )
-    return int(result.scalar_one() or 0)
+    return list(result.scalars().all())
 
 
 async def get_conversation_members(
@@ -56,29 +60,17 @@ async def get_conversation_members(
     return list(result.scalars().all())
 
 
+def direct_key(user_id: UUID, other_id: UUID) -> str:
+    """The canonical key of the one-to-one conversation between two users."""
+    low, high = sorted((str(user_id), str(other_id)))
+    return f"{low}:{high}"
+
+
 async def get_one_to_one_conversation_between(
     user_id: UUID, recipient_id: UUID, session: AsyncSession
 ) -> Conversation | None:
-    both_members_subq = (
-        select(ConversationMember.conversation_id)
-        .where(ConversationMember.user_id.in_([user_id, recipient_id]))
-        .group_by(ConversationMember.conversation_id)
-        .having(func.count(ConversationMember.user_id) == 2)
-        .subquery()
-    )
-
-    total_members_subq = (
-        select(ConversationMember.conversation_id)
-        .group_by(ConversationMember.conversation_id)
-        .having(func.count(ConversationMember.user_id) == 2)
-        .subquery()
-    )
-
     result = await session.execute(
-        select(Conversation)
-        .where(Conversation.is_group.is_(False))
-        .where(Conversation.id.in_(select(both_members_subq.c.conversation_id)))
-        .where(Conversation.id.in_(select(total_members_subq.c.conversation_id)))
+        select(Conversation).where(Conversation.direct_key == direct_key(user_id, recipient_id))
     )
     return result.scalar_one_or_none()
 
@@ -90,26 +82,38 @@ async def get_or_create_one_to_one_conversation(
     if existing:
         return existing
 
-    conversation = Conversation(is_group=False)
-    session.add(conversation)
-    await session.flush()
-
-    session.add_all(
-        [
-            ConversationMember(
-                conversation_id=conversation.id,
-                user_id=user_id,
-                role=ROLE_MEMBER,
-            ),
-            ConversationMember(
-                conversation_id=conversation.id,
-                user_id=recipient_id,
-                role=ROLE_MEMBER,
-            ),
-        ]
+    conversation = Conversation(
+        is_group=False, direct_key=direct_key(user_id, recipient_id), member_count=2
     )
+    try:
+        # The unique direct_key decides concurrent creators; the loser's
+        # savepoint rolls back and it returns the winner's conversation.
+        async with session.begin_nested():
+            session.add(conversation)
+            await session.flush()
+            session.add_all(
+                [
+                    ConversationMember(
+                        conversation_id=conversation.id,
+                        user_id=user_id,
+                        role=ROLE_MEMBER,
+                    ),
+                    ConversationMember(
+                        conversation_id=conversation.id,
+                        user_id=recipient_id,
+                        role=ROLE_MEMBER,
+                    ),
+                ]
+            )
+    except IntegrityError:
+        existing = await get_one_to_one_conversation_between(user_id, recipient_id, session)
+        if existing is None:
+            raise
+        return existing
+
     await session.commit()
     await session.refresh(conversation)
+    await _index_new_conversation(conversation, [user_id, recipient_id])
     return conversation
 
 
@@ -130,29 +134,26 @@ async def create_group_conversation(
         description=description,
         avatar_url=avatar_url,
         created_by=creator_id,
+        member_count=len(unique_members) + 1,
     )
     session.add(conversation)
     await session.flush()
 
-    session.add(
-        ConversationMember(
-            conversation_id=conversation.id,
-            user_id=creator_id,
-            role=ROLE_OWNER,
-        )
+    # One multi-row INSERT, however large the group.
+    await session.execute(
+        insert(ConversationMember),
+        [
+            {"conversation_id": conversation.id, "user_id": creator_id, "role": ROLE_OWNER},
+            *(
+                {"conversation_id": conversation.id, "user_id": member_id, "role": ROLE_MEMBER}
+                for member_id in unique_members
+            ),
+        ],
     )
 
-    for member_id in unique_members:
-        session.add(
-            ConversationMember(
-                conversation_id=conversation.id,
-                user_id=member_id,
-                role=ROLE_MEMBER,
-            )
-        )
-
     await session.commit()
     await session.refresh(conversation)
+    await _index_new_conversation(conversation, [creator_id, *unique_members])
     return conversation
 
 
@@ -172,6 +173,7 @@ async def update_group_conversation(
 
     await session.commit()
     await session.refresh(conversation)
+    await inbox.update_inboxes([conversation_summary(conversation)])
     return conversation
 
 
@@ -184,11 +186,56 @@ async def add_group_member(
         role=ROLE_MEMBER,
     )
     session.add(membership)
+    await _adjust_member_count(conversation_id, 1, session)
     await session.commit()
+    await membership_cache.set_member_roles(conversation_id, {user_id: ROLE_MEMBER})
     await session.refresh(membership)
+    # The joiner's unread count is unknown here; their next inbox read loads it.
+    await _index_member_change(
+        conversation_id, session, [(user_id, conversation_id, inbox.UNREAD_FORGET, 0)]
+    )
     return membership
 
 
+async def add_group_members(
+    conversation_id: UUID, user_ids: Iterable[UUID], session: AsyncSession
+) -> list[ConversationMember]:
+    """Add many members at once, skipping existing ones; returns those added.
+
+    One query finds who is already a member and one multi-row INSERT adds
+    the rest. A concurrent add of the same user raises IntegrityError.
+    """
+    user_ids = set(user_ids)
+    existing = await session.scalars(
+        select(ConversationMember.user_id)
+        .where(ConversationMember.conversation_id == conversation_id)
+        .where(ConversationMember.user_id.in_(user_ids))
+    )
+    new_ids = user_ids - set(existing.all())
+    if not new_ids:
+        return []
+
+    result = await session.scalars(
+        insert(ConversationMember).returning(ConversationMember),
+        [
+            {"conversation_id": conversation_id, "user_id": user_id, "role": ROLE_MEMBER}
+            for user_id in new_ids
+        ],
+    )
+    memberships = list(result.all())
+    await _adjust_member_count(conversation_id, len(memberships), session)
+    await session.commit()
+    await membership_cache.set_member_roles(
+        conversation_id, {user_id: ROLE_MEMBER for user_id in new_ids}
+    )
+    await _index_member_change(
+        conversation_id,
+        session,
+        [(user_id, conversation_id, inbox.UNREAD_FORGET, 0) for user_id in new_ids],
+    )
+    return memberships
+
+
 async def remove_group_member(
     conversation_id: UUID, user_id: UUID, session: AsyncSession
 ) -> None:
@@ -197,7 +244,11 @@ async def remove_group_member(
         return
 
     await session.delete(membership)
+    await _adjust_member_count(conversation_id, -1, session)
     await session.commit()
+    await membership_cache.remove_members(conversation_id, [user_id])
+    await inbox.remove_from_inboxes(conversation_id, [user_id])
+    await _index_member_change(conversation_id, session)
 
 
 async def update_member_role(
@@ -212,15 +263,319 @@ async def update_member_role(
 
     membership.role = role
     await session.commit()
+    await membership_cache.set_member_roles(conversation_id, {user_id: role})
     await session.refresh(membership)
     return membership
 
 
+async def mark_conversation_read(
+    conversation_id: UUID,
+    user_id: UUID,
+    session: AsyncSession,
+    message_id: UUID | None = None,
+) -> ConversationMember | None:
+    """Move a member's read cursor to ``message_id`` (default: the newest message).
+
+    One UPDATE, and the cursor only moves forward. Returns the membership
+    with its new cursor, or None if nothing moved.
+    """
+    target = select(Message.id, Message.created_at).where(
+        Message.conversation_id == conversation_id
+    )
+    if message_id is None:
+        target = target.order_by(Message.created_at.desc(), Message.id.desc())
+    else:
+        target = target.where(Message.id == message_id)
+    target = target.limit(1).subquery()
+
+    # UPDATE ... FROM (target): no matching message means no row to update.
+    result = await session.execute(
+        update(ConversationMember)
+        .where(ConversationMember.conversation_id == conversation_id)
+        .where(ConversationMember.user_id == user_id)
+        .where(
+            or_(
+                ConversationMember.last_read_at.is_(None),
+                tuple_(ConversationMember.last_read_at, ConversationMember.last_read_message_id)
+                < tuple_(target.c.created_at, target.c.id),
+            )
+        )
+        .values(last_read_message_id=target.c.id, last_read_at=target.c.created_at)
+        .returning(ConversationMember)
+        .execution_options(synchronize_session=False)
+    )
+    membership = result.scalar_one_or_none()
+    await session.commit()
+    if membership is not None:
+        await inbox.forget_unread(user_id, conversation_id)
+    return membership
+
+
+async def _adjust_member_count(conversation_id: UUID, delta: int, session: AsyncSession) -> None:
+    await session.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        # Membership changes are not activity: keep the inbox order.
+        .values(member_count=Conversation.member_count + delta, updated_at=Conversation.updated_at)
+    )
+
+
+def _preview(content: str) -> str:
+    return content[:LAST_MESSAGE_PREVIEW_LENGTH]
+
+
+_conversations = Conversation.__table__
+_is_newer = or_(
+    _conversations.c.last_message_at.is_(None),
+    _conversations.c.last_message_at
+    < bindparam("b_at", type_=_conversations.c.last_message_at.type),
+)
+# Executed once per batch with one parameter set per conversation. The last
+# message only moves forward, so racing writers cannot roll it back.
+_record_messages = (
+    update(_conversations)
+    .where(_conversations.c.id == bindparam("b_id"))
+    .values(
+        last_message_id=case(
+            (_is_newer, bindparam("b_message_id", type_=_conversations.c.last_message_id.type)),
+            else_=_conversations.c.last_message_id,
+        ),
+        last_message_at=case(
+            (_is_newer, bindparam("b_at")), else_=_conversations.c.last_message_at
+        ),
+        last_message_preview=case(
+            (_is_newer, bindparam("b_preview", type_=_conversations.c.last_message_preview.type)),
+            else_=_conversations.c.last_message_preview,
+        ),
+        updated_at=case((_is_newer, bindparam("b_at")), else_=_conversations.c.updated_at),
+        message_count=_conversations.c.message_count + bindparam("b_count"),
+    )
+)
+
+
+async def record_new_messages(messages: Iterable[Message], session: AsyncSession) -> None:
+    """Fold freshly inserted messages into their conversations' summaries.
+
+    Runs in the caller's transaction, so summary and messages commit
+    together. Messages must already carry ``id`` and ``created_at``.
+    """
+    latest: dict[UUID, Message] = {}
+    counts: dict[UUID, int] = {}
+    for message in messages:
+        conversation_id = message.conversation_id
+        counts[conversation_id] = counts.get(conversation_id, 0) + 1
+        current = latest.get(conversation_id)
+        if current is None or (message.created_at, message.id) > (current.created_at, current.id):
+            latest[conversation_id] = message
+    if not latest:
+        return
+
+    # Fixed lock order, so concurrent batches touching the same rows cannot deadlock.
+    params = [
+        {
+            "b_id": conversation_id,
+            "b_message_id": message.id,
+            "b_at": message.created_at,
+            "b_preview": _preview(message.content),
+            "b_count": counts[conversation_id],
+        }
+        for conversation_id, message in sorted(latest.items(), key=lambda item: str(item[0]))
+    ]
+    await session.execute(_record_messages, params)
+    # Core executemany bypasses the ORM: reload any copies this session holds.
+    for conversation_id in latest:
+        conversation = session.identity_map.get(identity_key(Conversation, conversation_id))
+        if conversation is not None:
+            session.expire(conversation)
+
+
+async def refresh_conversation_summaries(
+    conversation_ids: Iterable[UUID], session: AsyncSession
+) -> None:
+    """Recompute summaries from the messages and members tables.
+
+    For the rare writes that bypass the incremental path, such as cascade
+    deletes when a user goes away. Does not commit.
+    """
+    conversation_ids = list(conversation_ids)
+    if not conversation_ids:
+        return
+
+    last_message = (
+        select(Message)
+        .where(Message.conversation_id == Conversation.id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(1)
+        .correlate(Conversation)
+    )
+    last_message_id = last_message.with_only_columns(Message.id).scalar_subquery()
+    last_message_at = last_message.with_only_columns(Message.created_at).scalar_subquery()
+    last_content = last_message.with_only_columns(
+        func.substr(Message.content, 1, LAST_MESSAGE_PREVIEW_LENGTH)
+    ).scalar_subquery()
+    message_count = (
+        select(func.count(Message.id))
+        .where(Message.conversation_id == Conversation.id)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+    member_count = (
+        select(func.count(ConversationMember.id))
+        .where(ConversationMember.conversation_id == Conversation.id)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+    await session.execute(
+        update(Conversation)
+        .where(Conversation.id.in_(conversation_ids))
+        .values(
+            last_message_id=last_message_id,
+            last_message_at=last_message_at,
+            last_message_preview=last_content,
+            message_count=message_count,
+            member_count=member_count,
+            updated_at=Conversation.updated_at,
+        )
+    )
+
+
+def conversation_summary(conversation: Conversation) -> dict:
+    """The inbox fields every member shares; ``unread_count`` is added per member."""
+    return {
+        "id": conversation.id,
+        "is_group": conversation.is_group,
+        "name": conversation.name,
+        "description": conversation.description,
+        "avatar_url": conversation.avatar_url,
+        "created_at": conversation.created_at,
+        "updated_at": conversation.updated_at,
+        "last_message": conversation.last_message_preview,
+        "last_message_at": conversation.last_message_at,
+        "member_count": conversation.member_count,
+    }
+
+
+async def _index_member_change(
+    conversation_id: UUID,
+    session: AsyncSession,
+    changes: Iterable[tuple[UUID, UUID, str, int]] = (),
+) -> None:
+    """Push the new member count to the inbox index after a committed change.
+
+    The conversation may have been deleted since the commit; there is then
+    no summary to push, and members' indexes drop it on their next read.
+    """
+    conversation = await session.get(Conversation, conversation_id)
+    if conversation is None:
+        return
+    await inbox.update_inboxes([conversation_summary(conversation)], changes)
+
+
+async def _index_new_conversation(conversation: Conversation, user_ids: list[UUID]) -> None:
+    await inbox.update_inboxes(
+        [conversation_summary(conversation)],
+        [(user_id, conversation.id, inbox.UNREAD_SET, 0) for user_id in user_ids],
+    )
+
+
+async def index_new_messages(messages: Iterable[Message], session: AsyncSession) -> None:
+    """Fan committed messages out to their members' inbox indexes.
+
+    Two queries per batch, for the updated summaries and the members, then
+    one Redis pipeline; each member's unread count grows by the messages
+    others sent.
+    """
+    totals: dict[UUID, int] = {}
+    sent: dict[tuple[UUID, UUID], int] = {}
+    for message in messages:
+        totals[message.conversation_id] = totals.get(message.conversation_id, 0) + 1
+        key = (message.conversation_id, message.sender_id)
+        sent[key] = sent.get(key, 0) + 1
+    if not totals:
+        return
+
+    conversations = await session.scalars(
+        select(Conversation)
+        .where(Conversation.id.in_(totals))
+        .execution_options(populate_existing=True)
+    )
+    members = await session.execute(
+        select(ConversationMember.user_id, ConversationMember.conversation_id).where(
+            ConversationMember.conversation_id.in_(totals)
+        )
+    )
+    await inbox.update_inboxes(
+        [conversation_summary(conversation) for conversation in conversations],
+        [
+            (
+                user_id,
+                conversation_id,
+                inbox.UNREAD_ADD,
+                totals[conversation_id] - sent.get((conversation_id, user_id), 0),
+            )
+            for user_id, conversation_id in members.all()
+        ],
+    )
+
+
+async def get_user_inbox(
+    user_id: UUID, session: AsyncSession, offset: int = 0, limit: int = 50
+) -> list[dict]:
+    """A page of the user's inbox, served from the Redis index when it can be.
+
+    A cold index is rebuilt from one ``list_user_conversations`` call; a
+    warm one costs two pipelined round-trips, plus one query for any
+    conversations on the page whose cached entries are missing.
+    """
+    page = await inbox.read_page(user_id, offset, limit)
+    if page is None:
+        items = await list_user_conversations(user_id, session)
+        await inbox.store_inbox(user_id, items)
+        return items[offset:offset + limit]
+
+    ids, items = page
+    missing = [conversation_id for conversation_id in ids if conversation_id not in items]
+    if missing:
+        loaded = await list_user_conversations(user_id, session, conversation_ids=missing)
+        items.update((item["id"], item) for item in loaded)
+        await inbox.update_inboxes(
+            loaded,
+            [(user_id, item["id"], inbox.UNREAD_SET, item["unread_count"]) for item in loaded],
+            inbox.SUMMARY_FILL,
+        )
+        for conversation_id in missing:
+            if conversation_id not in items:  # left since it was indexed
+                await inbox.remove_from_inboxes(conversation_id, [user_id])
+    return [items[conversation_id] for conversation_id in ids if conversation_id in items]
+
+
 async def list_user_conversations(
-    user_id: UUID, session: AsyncSession
+    user_id: UUID, session: AsyncSession, conversation_ids: list[UUID] | None = None
 ) -> list[dict]:
-    conversations_result = await session.execute(
-        select(Conversation)
+    """The user's inbox, most recently active first.
+
+    Last message, member count and ordering are read from the summary
+    columns maintained on write; only the unread count, which is per
+    member, is computed, as a range count past the read cursor on the
+    (conversation_id, created_at, id) index.
+    """
+    unread_count = (
+        select(func.count(Message.id))
+        .where(Message.conversation_id == Conversation.id)
+        .where(Message.sender_id != user_id)
+        .where(
+            or_(
+                ConversationMember.last_read_at.is_(None),
+                tuple_(Message.created_at, Message.id)
+                > tuple_(ConversationMember.last_read_at, ConversationMember.last_read_message_id),
+            )
+        )
+        .correlate(Conversation, ConversationMember)
+        .scalar_subquery()
+    )
+
+    query = (
+        select(Conversation, unread_count)
         .join(
             ConversationMember,
             ConversationMember.conversation_id == Conversation.id,
@@ -228,47 +583,14 @@ async def list_user_conversations(
         .where(ConversationMember.user_id == user_id)
         .order_by(Conversation.updated_at.desc())
     )
-    conversations = list(conversations_result.scalars().all())
-
-    items: list[dict] = []
-    for conversation in conversations:
-        message_result = await session.execute(
-            select(Message)
-            .where(Message.conversation_id == conversation.id)
-            .order_by(Message.created_at.desc())
-            .limit(1)
-        )
-        last_message = message_result.scalar_one_or_none()
-
-        unread_result = await session.execute(
-            select(func.count(Message.id)).where(
-                and_(
-                    Message.conversation_id == conversation.id,
-                    Message.sender_id != user_id,
-                    Message.is_read.is_(False),
-                )
-            )
-        )
-        unread_count = int(unread_result.scalar_one() or 0)
-
-        member_count = await get_conversation_member_count(conversation.id, session)
-
-        items.append(
-            {
-                "id": conversation.id,
-                "is_group": conversation.is_group,
-                "name": conversation.name,
-                "description": conversation.description,
-                "avatar_url": conversation.avatar_url,
-                "created_at": conversation.created_at,
-                "last_message": last_message.content if last_message else None,
-                "last_message_at": last_message.created_at if last_message else None,
-                "unread_count": unread_count,
-                "member_count": member_count,
-            }
-        )
-
-    return items
+    if conversation_ids is not None:
+        query = query.where(Conversation.id.in_(conversation_ids))
+    result = await session.execute(query)
+
+    return [
+        {**conversation_summary(conversation), "unread_count": int(unread or 0)}
+        for conversation, unread in result.all()
+    ]
 
 
 def can_manage_members(role: str) -> bool:
@@ -0,0 +1,50 @@
+import time
+from collections.abc import Callable, Hashable
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+PRESENCE_OFFLINE = "offline"
+
+
+class EventCoalescer:
+    """Suppresses repeats of the same event for a key within a time window.
+
+    Typing indicators are pinged every few seconds by clients; only the first
+    ping of a run (or one after the window lapses) needs to reach the room.
+    """
+
+    def __init__(self, window: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.window = window
+        self._clock = clock
+        self._last: dict[Hashable, tuple[str, float]] = {}
+
+    def should_send(self, key: Hashable, event_type: str) -> bool:
+        now = self._clock()
+        last = self._last.get(key)
+        if last is not None and last[0] == event_type and now - last[1] < self.window:
+            return False
+        self._last[key] = (event_type, now)
+        return True
+
+
+def _presence_key(user_id: UUID) -> str:
+    return f"presence:{user_id}"
+
+
+async def set_presence(user_id: UUID, status: str) -> None:
+    """Record a user's presence; it lapses to offline unless refreshed."""
+    await redis_client.set(
+        _presence_key(user_id), status, ex=settings.WS_PRESENCE_TTL_SECONDS
+    )
+
+
+async def get_presence(user_ids: list[UUID]) -> dict[UUID, str]:
+    """Presence for many users in one MGET; offline users are omitted."""
+    if not user_ids:
+        return {}
+    statuses = await redis_client.mget([_presence_key(user_id) for user_id in user_ids])
+    return {
+        user_id: status for user_id, status in zip(user_ids, statuses) if status is not None
+    }
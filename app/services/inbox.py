@@ -0,0 +1,252 @@
+"""Per-user inbox index in Redis, so listing conversations skips Postgres.
+
+``inbox:{user_id}``           sorted set: conversation id -> last activity
+``inbox:{user_id}:unread``    hash: conversation id -> unread count
+``conversation:{id}:summary`` hash: the inbox fields shared by every member
+
+A user's sorted set existing means their index is complete; writes only
+touch built indexes, so a partial one can never pass for complete. A
+missing summary or unread field is a partial miss that the caller fills
+from Postgres. Every key has a TTL, bounding anything a race leaves stale.
+
+A summary also stores its ``updated_at`` as ``score`` and is only ever
+replaced by one at least as new, so a snapshot read from Postgres cannot
+overwrite what a later commit already wrote. Fills, which only load what
+Postgres holds, never replace a summary of the same age.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime
+from uuid import UUID
+
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+SUMMARY_FIELDS = (
+    "id",
+    "is_group",
+    "name",
+    "description",
+    "avatar_url",
+    "created_at",
+    "updated_at",
+    "last_message",
+    "last_message_at",
+    "member_count",
+)
+_DATETIME_FIELDS = ("created_at", "updated_at", "last_message_at")
+
+UNREAD_ADD = "add"
+UNREAD_SET = "set"
+UNREAD_FORGET = "forget"
+
+# Touch one member's index if it is built. The score only moves forward;
+# an increment applies only to a count already known.
+_TOUCH_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local score = tonumber(redis.call('ZSCORE', KEYS[1], ARGV[1]))
+if not score or score < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+end
+if ARGV[3] == 'set' then
+    redis.call('HSET', KEYS[2], ARGV[1], ARGV[4])
+elseif ARGV[3] == 'forget' then
+    redis.call('HDEL', KEYS[2], ARGV[1])
+elseif redis.call('HEXISTS', KEYS[2], ARGV[1]) == 1 then
+    redis.call('HINCRBY', KEYS[2], ARGV[1], ARGV[4])
+end
+return 1
+"""
+_touch = redis_client.register_script(_TOUCH_LUA)
+
+SUMMARY_FILL = "fill"
+SUMMARY_UPDATE = "update"
+
+# Replace a summary unless the stored one is newer, or as new for a fill.
+# ARGV: score, mode, TTL, field/value...
+_STORE_SUMMARY_LUA = """
+local stored = tonumber(redis.call('HGET', KEYS[1], 'score'))
+local score = tonumber(ARGV[1])
+if stored and (stored > score or (stored == score and ARGV[2] == 'fill')) then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'score', ARGV[1], unpack(ARGV, 4))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+_store_summary = redis_client.register_script(_STORE_SUMMARY_LUA)
+
+
+def _inbox_key(user_id: UUID) -> str:
+    return f"inbox:{user_id}"
+
+
+def _unread_key(user_id: UUID) -> str:
+    return f"inbox:{user_id}:unread"
+
+
+def _summary_key(conversation_id: UUID | str) -> str:
+    return f"conversation:{conversation_id}:summary"
+
+
+def _score(item: dict) -> float:
+    return item["updated_at"].timestamp()
+
+
+def _encode(item: dict) -> dict[str, str]:
+    # Absent fields are None: HGETALL cannot tell "" from NULL otherwise.
+    fields = {}
+    for name in SUMMARY_FIELDS:
+        value = item.get(name)
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = int(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        fields[name] = str(value)
+    return fields
+
+
+def _decode(fields: dict[str, str]) -> dict:
+    item = {name: fields.get(name) for name in SUMMARY_FIELDS}
+    item["id"] = UUID(item["id"])
+    item["is_group"] = item["is_group"] == "1"
+    item["member_count"] = int(item["member_count"] or 0)
+    for name in _DATETIME_FIELDS:
+        if item[name] is not None:
+            item[name] = datetime.fromisoformat(item[name])
+    return item
+
+
+async def _queue_summary(pipe, item: dict, mode: str) -> None:
+    args = [_score(item), mode, settings.INBOX_CACHE_TTL_SECONDS]
+    args += [value for pair in _encode(item).items() for value in pair]
+    await _store_summary(keys=[_summary_key(item["id"])], args=args, client=pipe)
+
+
+async def read_page(
+    user_id: UUID, offset: int, limit: int
+) -> tuple[list[UUID], dict[UUID, dict]] | None:
+    """One page of the user's index: ids newest first, plus the cached items.
+
+    Ids without a cached summary or unread count are absent from the dict.
+    Returns None when the index is not built or Redis is unavailable.
+    """
+    key = _inbox_key(user_id)
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.exists(key)
+            pipe.zrevrange(key, offset, offset + limit - 1)
+            built, ids = await pipe.execute()
+        if not built:
+            return None
+        if not ids:
+            return [], {}
+
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for conversation_id in ids:
+                pipe.hgetall(_summary_key(conversation_id))
+            pipe.hmget(_unread_key(user_id), ids)
+            *summaries, unread = await pipe.execute()
+    except (RedisError, OSError):
+        return None
+
+    items = {}
+    for summary, count in zip(summaries, unread):
+        if summary and count is not None:
+            item = _decode(summary)
+            item["unread_count"] = int(count)
+            items[item["id"]] = item
+    return [UUID(conversation_id) for conversation_id in ids], items
+
+
+async def store_inbox(user_id: UUID, items: list[dict]) -> None:
+    """Replace the user's index with ``items``, as loaded from Postgres.
+
+    An empty inbox is not indexed, so any old index is only dropped.
+    """
+    inbox_key, unread_key = _inbox_key(user_id), _unread_key(user_id)
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(inbox_key, unread_key)
+            if not items:
+                await pipe.execute()
+                return
+            pipe.zadd(inbox_key, {str(item["id"]): _score(item) for item in items})
+            pipe.hset(unread_key, mapping={str(item["id"]): item["unread_count"] for item in items})
+            pipe.expire(inbox_key, settings.INBOX_CACHE_TTL_SECONDS)
+            pipe.expire(unread_key, settings.INBOX_CACHE_TTL_SECONDS)
+            for item in items:
+                await _queue_summary(pipe, item, SUMMARY_FILL)
+            await pipe.execute()
+    except (RedisError, OSError):
+        pass
+
+
+async def update_inboxes(
+    items: Iterable[dict],
+    changes: Iterable[tuple[UUID, UUID, str, int]] = (),
+    mode: str = SUMMARY_UPDATE,
+) -> None:
+    """Refresh conversation summaries and touch members' indexes in one round-trip.
+
+    ``changes`` are ``(user_id, conversation_id, mode, value)``: mode
+    UNREAD_ADD adds ``value`` to the unread count, UNREAD_SET sets it and
+    UNREAD_FORGET drops it to be reloaded. Each touch also moves the
+    conversation up to its summary's ``updated_at``; changes for a
+    conversation without an item, e.g. one deleted meanwhile, are skipped.
+    ``mode`` is SUMMARY_FILL when ``items`` were just loaded from Postgres.
+    """
+    scores = {}
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            for item in items:
+                scores[item["id"]] = _score(item)
+                await _queue_summary(pipe, item, mode)
+            for user_id, conversation_id, unread_mode, value in changes:
+                score = scores.get(conversation_id)
+                if score is None:
+                    continue
+                await _touch(
+                    keys=[_inbox_key(user_id), _unread_key(user_id)],
+                    args=[str(conversation_id), score, unread_mode, value],
+                    client=pipe,
+                )
+            await pipe.execute()
+    except (RedisError, OSError):
+        pass
+
+
+async def remove_from_inboxes(conversation_id: UUID, user_ids: Iterable[UUID]) -> None:
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.zrem(_inbox_key(user_id), str(conversation_id))
+                pipe.hdel(_unread_key(user_id), str(conversation_id))
+            await pipe.execute()
+    except (RedisError, OSError):
+        pass
+
+
+async def forget_unread(user_id: UUID, conversation_id: UUID) -> None:
+    """Drop a cached unread count after the read cursor moves."""
+    try:
+        await redis_client.hdel(_unread_key(user_id), str(conversation_id))
+    except (RedisError, OSError):
+        pass
+
+
+async def drop_inbox(user_id: UUID, conversation_ids: Iterable[UUID] = ()) -> None:
+    """Forget a user's index, and the summaries of ``conversation_ids``."""
+    keys = [_inbox_key(user_id), _unread_key(user_id)]
+    keys += [_summary_key(conversation_id) for conversation_id in conversation_ids]
+    try:
+        await redis_client.delete(*keys)
+    except (RedisError, OSError):
+        pass
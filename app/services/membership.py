@@ -0,0 +1,287 @@
+"""Conversation membership cache shared by REST and WebSocket authorization.
+
+``members:{conversation_id}`` is a Redis hash of user id -> role, plus a
+KIND_FIELD saying whether the conversation is a group, a direct one or does
+not exist. The hash existing means it is complete, so a missing user field
+is a cached "not a member". Each worker keeps an L1 of answers in front of
+it. Writers update the hash and publish the conversation id on
+INVALIDATION_CHANNEL so every worker drops its L1 entry; the L1 TTL bounds
+a lost message.
+
+``members:{conversation_id}:version`` is bumped by every write. A fill
+records the version before reading Postgres and stores its snapshot only if
+the version is unchanged, so a fill that raced a membership change can
+never put the old member list back.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import NamedTuple
+from uuid import UUID
+
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.models.conversation import Conversation
+from app.models.conversation_member import ConversationMember
+from app.models.user import User
+from app.schemas.user import Principal
+from app.services.principal import store_principal
+
+KIND_FIELD = "*"
+KIND_GROUP = "group"
+KIND_DIRECT = "direct"
+KIND_MISSING = "missing"
+
+INVALIDATION_CHANNEL = "membership:invalidate"
+# Lua's unpack() is limited to a few thousand values; write in chunks.
+_SET_CHUNK = 1000
+
+_SET_IF_BUILT_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HSET', KEYS[1], unpack(ARGV))
+end
+return 0
+"""
+_set_if_built = redis_client.register_script(_SET_IF_BUILT_LUA)
+
+# Replace the hash with a snapshot unless a write bumped the version since
+# the snapshot was read. ARGV: version seen ('' if none), TTL, field/value...
+_FILL_IF_CURRENT_LUA = f"""
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+for i = 3, #ARGV, 2 * {_SET_CHUNK} do
+    redis.call('HSET', KEYS[1], unpack(ARGV, i, math.min(i + 2 * {_SET_CHUNK} - 1, #ARGV)))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+_fill_if_current = redis_client.register_script(_FILL_IF_CURRENT_LUA)
+
+
+class Membership(NamedTuple):
+    kind: str
+    role: str | None
+
+    @property
+    def exists(self) -> bool:
+        return self.kind != KIND_MISSING
+
+    @property
+    def is_group(self) -> bool:
+        return self.kind == KIND_GROUP
+
+
+class LocalMembershipCache:
+    """Per-worker answers, per conversation, for a few seconds at most."""
+
+    def __init__(self, ttl: float, max_conversations: int) -> None:
+        self._ttl = ttl
+        self._max_conversations = max_conversations
+        self._entries: OrderedDict[UUID, tuple[float, dict[str, str | None]]] = OrderedDict()
+
+    def get(self, conversation_id: UUID, user_id: UUID) -> Membership | None:
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return None
+        expires_at, fields = entry
+        if expires_at < time.monotonic():
+            del self._entries[conversation_id]
+            return None
+        user_field = str(user_id)
+        if user_field not in fields:
+            return None
+        self._entries.move_to_end(conversation_id)
+        return Membership(fields[KIND_FIELD], fields[user_field])
+
+    def put(self, conversation_id: UUID, user_id: UUID, membership: Membership) -> None:
+        entry = self._entries.get(conversation_id)
+        if entry is None or entry[0] < time.monotonic():
+            entry = (time.monotonic() + self._ttl, {KIND_FIELD: membership.kind})
+            self._entries[conversation_id] = entry
+        entry[1][str(user_id)] = membership.role
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self._max_conversations:
+            self._entries.popitem(last=False)
+
+    def drop(self, conversation_id: UUID) -> None:
+        self._entries.pop(conversation_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+local_cache = LocalMembershipCache(
+    settings.MEMBERSHIP_LOCAL_TTL_SECONDS, settings.MEMBERSHIP_LOCAL_MAX_CONVERSATIONS
+)
+
+
+def _members_key(conversation_id: UUID) -> str:
+    return f"members:{conversation_id}"
+
+
+def _version_key(conversation_id: UUID) -> str:
+    return f"members:{conversation_id}:version"
+
+
+def _queue_bump(pipe, conversation_id: UUID) -> None:
+    key = _version_key(conversation_id)
+    pipe.incr(key)
+    pipe.expire(key, settings.MEMBERSHIP_CACHE_TTL_SECONDS)
+
+
+async def _load(
+    conversation_id: UUID, user_id: UUID, session: AsyncSession
+) -> tuple[dict[str, str], Principal | None]:
+    """Every member of the conversation and its kind, plus the asking user's principal.
+
+    One query: the user's flags ride along as scalar subqueries, so a cold
+    access check does not need a second round-trip for them.
+    """
+    is_active = select(User.is_active).where(User.id == user_id).scalar_subquery()
+    is_superuser = select(User.is_superuser).where(User.id == user_id).scalar_subquery()
+    result = await session.execute(
+        select(
+            Conversation.is_group,
+            ConversationMember.user_id,
+            ConversationMember.role,
+            is_active.label("is_active"),
+            is_superuser.label("is_superuser"),
+        )
+        .outerjoin(ConversationMember, ConversationMember.conversation_id == Conversation.id)
+        .where(Conversation.id == conversation_id)
+    )
+    rows = result.all()
+    if not rows:
+        return {KIND_FIELD: KIND_MISSING}, None
+    fields = {KIND_FIELD: KIND_GROUP if rows[0].is_group else KIND_DIRECT}
+    fields.update((str(row.user_id), row.role) for row in rows if row.user_id is not None)
+    principal = None
+    if rows[0].is_active is not None:
+        principal = Principal(
+            id=user_id, is_active=rows[0].is_active, is_superuser=rows[0].is_superuser
+        )
+    return fields, principal
+
+
+async def get_cached_membership(
+    conversation_id: UUID, user_id: UUID, session: AsyncSession
+) -> Membership:
+    """The conversation's kind and the user's role in it (None if not a member).
+
+    Served from the L1, then Redis; a miss loads the whole member list once
+    so later checks for any member of the conversation cost no query.
+    """
+    membership = local_cache.get(conversation_id, user_id)
+    if membership is not None:
+        return membership
+
+    key, version_key = _members_key(conversation_id), _version_key(conversation_id)
+    try:
+        kind, role = await redis_client.hmget(key, [KIND_FIELD, str(user_id)])
+        version = await redis_client.get(version_key) if kind is None else None
+    except (RedisError, OSError):
+        kind = role = version = None
+
+    if kind is None:
+        fields, principal = await _load(conversation_id, user_id, session)
+        kind, role = fields[KIND_FIELD], fields.get(str(user_id))
+        if principal is not None:
+            await store_principal(principal)
+        args = [version or "", settings.MEMBERSHIP_CACHE_TTL_SECONDS]
+        args += [value for pair in fields.items() for value in pair]
+        try:
+            await _fill_if_current(keys=[key, version_key], args=args, client=redis_client)
+        except (RedisError, OSError):
+            pass
+
+    membership = Membership(kind, role)
+    local_cache.put(conversation_id, user_id, membership)
+    return membership
+
+
+async def _invalidate_local(conversation_ids: list[UUID]) -> None:
+    for conversation_id in conversation_ids:
+        local_cache.drop(conversation_id)
+    try:
+        await redis_client.publish(INVALIDATION_CHANNEL, ",".join(map(str, conversation_ids)))
+    except (RedisError, OSError):
+        pass
+
+
+async def set_member_roles(conversation_id: UUID, roles: dict[UUID, str]) -> None:
+    """Record added members or changed roles; call after the commit."""
+    if not roles:
+        return
+    pairs = [(str(user_id), role) for user_id, role in roles.items()]
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            _queue_bump(pipe, conversation_id)
+            for start in range(0, len(pairs), _SET_CHUNK):
+                args = [value for pair in pairs[start:start + _SET_CHUNK] for value in pair]
+                await _set_if_built(keys=[_members_key(conversation_id)], args=args, client=pipe)
+            await pipe.execute()
+    except (RedisError, OSError):
+        pass
+    await _invalidate_local([conversation_id])
+
+
+async def remove_members(conversation_id: UUID, user_ids: Iterable[UUID]) -> None:
+    """Record removed members; call after the commit."""
+    user_fields = [str(user_id) for user_id in user_ids]
+    if not user_fields:
+        return
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            _queue_bump(pipe, conversation_id)
+            pipe.hdel(_members_key(conversation_id), *user_fields)
+            await pipe.execute()
+    except (RedisError, OSError):
+        pass
+    await _invalidate_local([conversation_id])
+
+
+async def forget_conversations(conversation_ids: Iterable[UUID]) -> None:
+    """Drop whole entries, e.g. after cascades removed members."""
+    conversation_ids = list(conversation_ids)
+    if not conversation_ids:
+        return
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            for conversation_id in conversation_ids:
+                _queue_bump(pipe, conversation_id)
+            pipe.delete(*map(_members_key, conversation_ids))
+            await pipe.execute()
+    except (RedisError, OSError):
+        pass
+    await _invalidate_local(conversation_ids)
+
+
+async def listen_for_invalidations(retry_delay: float = 1.0) -> None:
+    """Drop L1 entries that any worker invalidates; runs for the app's lifetime.
+
+    While disconnected, messages may be lost, so the L1 is cleared on every
+    (re)subscribe.
+    """
+    while True:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            local_cache.clear()
+            async for message in pubsub.listen():
+                for conversation_id in message["data"].split(","):
+                    try:
+                        local_cache.drop(UUID(conversation_id))
+                    except ValueError:
+                        continue  # not ours; the rest of the message still applies
+        except (RedisError, OSError):
+            await asyncio.sleep(retry_delay)
+        finally:
+            await pubsub.aclose()
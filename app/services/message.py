@@ -1,8 +1,10 @@
+from datetime import datetime, timezone
 from uuid import UUID
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.message import Message
+from app.services.conversation import index_new_messages, record_new_messages
 
 
 async def create_message(
@@ -12,21 +14,69 @@ async def create_message(
         conversation_id=conversation_id,
         sender_id=sender_id,
         content=content,
+        created_at=datetime.now(timezone.utc),
     )
     session.add(message)
+    await session.flush()
+    await record_new_messages([message], session)
     await session.commit()
     await session.refresh(message)
+    await index_new_messages([message], session)
     return message
 
 
 async def get_messages_for_conversation(
-    conversation_id: UUID, skip: int, limit: int, session: AsyncSession
-) -> list[Message]:
+    conversation_id: UUID,
+    limit: int,
+    session: AsyncSession,
+    before: UUID | None = None,
+    after: UUID | None = None,
+) -> list[Message] | None:
+    """A page of history, newest first, relative to an optional cursor message.
+
+    ``before`` pages back from a message and ``after`` pages forward from
+    one; with neither, the newest page. Each page is an index range scan on
+    (conversation_id, created_at, id), so its cost does not grow with depth.
+    Returns None when the cursor is not a message in this conversation.
+    """
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    position = tuple_(Message.created_at, Message.id)
+
+    cursor_id = before or after
+    if cursor_id is not None:
+        cursor = await session.get(Message, cursor_id)
+        if cursor is None or cursor.conversation_id != conversation_id:
+            return None
+        cursor_position = (cursor.created_at, cursor.id)
+        if before is not None:
+            query = query.where(position < cursor_position)
+        else:
+            query = query.where(position > cursor_position)
+
+    if after is not None:
+        # Take the page nearest the cursor, then flip it to newest first.
+        query = query.order_by(Message.created_at.asc(), Message.id.asc()).limit(limit)
+        result = await session.execute(query)
+        return list(reversed(result.scalars().all()))
+
+    query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+    result = await session.execute(query)
+    return list(result.scalars().all())
+
+
+async def get_messages_after(
+    conversation_id: UUID, message_id: UUID, limit: int, session: AsyncSession
+) -> list[Message] | None:
+    """Messages newer than ``message_id``, oldest first; None for an unknown cursor."""
+    cursor = await session.get(Message, message_id)
+    if cursor is None or cursor.conversation_id != conversation_id:
+        return None
+
     result = await session.execute(
         select(Message)
         .where(Message.conversation_id == conversation_id)
-        .order_by(Message.created_at.asc())
-        .offset(skip)
+        .where(tuple_(Message.created_at, Message.id) > (cursor.created_at, cursor.id))
+        .order_by(Message.created_at.asc(), Message.id.asc())
         .limit(limit)
     )
     return list(result.scalars().all())
@@ -0,0 +1,150 @@
+import asyncio
+import time
+from datetime import UTC, datetime
+from uuid import UUID, uuid4
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+from app.db.database import async_session_maker
+from app.models.message import Message
+from app.services.conversation import index_new_messages, record_new_messages
+
+BATCH_SIZE = Histogram(
+    "chat_message_batch_size",
+    "Messages inserted per group commit.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250),
+)
+COMMIT_LATENCY = Histogram(
+    "chat_message_batch_commit_seconds",
+    "Time to insert and commit one batch of messages.",
+)
+
+
+class MessageWriter:
+    """Group-commits messages sent from every socket on this worker.
+
+    Writes are collected for up to ``max_delay`` seconds or ``max_batch_size``
+    messages and inserted with one multi-row INSERT ... RETURNING in a single
+    transaction, which also updates each touched conversation's summary.
+    Each caller's await resolves only after that transaction commits, so a
+    returned message is as durable as with ``create_message``.
+    """
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession] = async_session_maker,
+        max_batch_size: int | None = None,
+        max_delay: float | None = None,
+    ) -> None:
+        self._session_maker = session_maker
+        self._max_batch_size = max_batch_size or settings.MESSAGE_BATCH_MAX_SIZE
+        self._max_delay = (
+            max_delay if max_delay is not None else settings.MESSAGE_BATCH_MAX_DELAY_MS / 1000
+        )
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._commit_tasks: set[asyncio.Task] = set()
+
+    async def write(self, conversation_id: UUID, sender_id: UUID, content: str) -> Message:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        row = {
+            "id": uuid4(),
+            "conversation_id": conversation_id,
+            "sender_id": sender_id,
+            "content": content,
+            # Stamped on arrival: a batch shares one transaction, so now() would tie.
+            "created_at": datetime.now(UTC),
+        }
+        self._pending.append((row, future))
+
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_delay, self._flush)
+
+        return await future
+
+    async def join(self) -> None:
+        """Wait for batches already committing, including their inbox fan-out."""
+        while self._commit_tasks:
+            # Discard here too: gather over finished tasks need not yield to their callbacks.
+            committing = list(self._commit_tasks)
+            await asyncio.gather(*committing, return_exceptions=True)
+            self._commit_tasks.difference_update(committing)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._commit(batch))
+        self._commit_tasks.add(task)
+        task.add_done_callback(self._commit_tasks.discard)
+
+    async def _commit(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        BATCH_SIZE.observe(len(batch))
+        started_at = time.monotonic()
+        try:
+            try:
+                messages = await self._insert([row for row, _ in batch])
+            except IntegrityError:
+                # One bad row, e.g. for a conversation deleted meanwhile,
+                # must fail only its own writer.
+                messages = await self._insert_each(batch)
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                return
+            COMMIT_LATENCY.observe(time.monotonic() - started_at)
+
+            by_id = {message.id: message for message in messages}
+            for row, future in batch:
+                if not future.done() and row["id"] in by_id:
+                    future.set_result(by_id[row["id"]])
+            await self._index(messages)
+        finally:
+            # Cancelled at shutdown: never leave a sender waiting forever.
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
+
+    async def _insert(self, rows: list[dict]) -> list[Message]:
+        async with self._session_maker() as session:
+            result = await session.scalars(insert(Message).returning(Message), rows)
+            messages = list(result.all())
+            await record_new_messages(messages, session)
+            await session.commit()
+        return messages
+
+    async def _insert_each(self, batch: list[tuple[dict, asyncio.Future]]) -> list[Message]:
+        """Retry a failed batch one row per transaction; errors go to their own writer."""
+        messages = []
+        for row, future in batch:
+            try:
+                messages += await self._insert([row])
+            except Exception as exc:
+                if not future.done():
+                    future.set_exception(exc)
+        return messages
+
+    async def _index(self, messages: list[Message]) -> None:
+        """Update members' inbox indexes once the senders have their answers."""
+        try:
+            async with self._session_maker() as session:
+                await index_new_messages(messages, session)
+        except SQLAlchemyError:
+            # The index is a cache: its TTL repairs what a failure here misses.
+            pass
+
+
+message_writer = MessageWriter()
@@ -0,0 +1,60 @@
+from uuid import UUID
+
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.models.user import User
+from app.schemas.user import Principal
+
+
+def _principal_key(user_id: UUID) -> str:
+    return f"principal:{user_id}"
+
+
+async def get_principal(user_id: UUID, session: AsyncSession) -> Principal | None:
+    """The user's id and flags, from Redis when cached; None if no such user.
+
+    Every authenticated request and socket check reads this, so it is kept
+    in Redis for a short TTL and invalidated whenever the user is updated
+    or deleted.
+    """
+    key = _principal_key(user_id)
+    try:
+        cached = await redis_client.get(key)
+    except (RedisError, OSError):
+        cached = None
+    if cached is not None:
+        return Principal.model_validate_json(cached)
+
+    result = await session.execute(
+        select(User.id, User.is_active, User.is_superuser).where(User.id == user_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+
+    principal = Principal.model_validate(row)
+    await store_principal(principal)
+    return principal
+
+
+async def store_principal(principal: Principal) -> None:
+    """Cache a principal read alongside other data, saving ``get_principal`` its query."""
+    try:
+        await redis_client.set(
+            _principal_key(principal.id),
+            principal.model_dump_json(),
+            ex=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+        )
+    except (RedisError, OSError):
+        pass
+
+
+async def invalidate_principal(user_id: UUID) -> None:
+    try:
+        await redis_client.delete(_principal_key(user_id))
+    except (RedisError, OSError):
+        pass
@@ -12,6 +12,12 @@ from app.utils.user import (
     get_all_users,
 )
 from app.core.redis import redis_client
+from app.services.principal import invalidate_principal
+from app.services import inbox, membership
+from app.services.conversation import (
+    list_user_conversation_ids,
+    refresh_conversation_summaries,
+)
 from app.exceptions.user import (
     UserNotFoundError,
     UserEmailExistsError,
@@ -29,7 +35,7 @@ async def create_user_service(user: UserCreate, session: AsyncSession):
     if not is_strong_password(user.password):
         raise WeakPasswordError()
 
-    hashed_password = get_hashed_password(user.password)
+    hashed_password = await get_hashed_password(user.password)
 
     new_user = User(
         **user.model_dump(exclude={"password"}),
@@ -96,11 +102,13 @@ async def update_user_service(
     # for var, value in vars(user_update).items():
     #     if value is not None:
     #         setattr(user, var, value)
-    for var, value in user_update.model_dump(exclude_unset=True).items():
+    updates = user_update.model_dump(exclude_unset=True)
+    for var, value in updates.items():
         setattr(user, var, value)
 
 
     await session.commit()
+    await invalidate_principal(user_id)
     await session.refresh(user)
     return user
 
@@ -113,6 +121,14 @@ async def delete_user_service(
     if not user:
         raise UserNotFoundError()
 
+    # Their memberships and messages go with them by cascade; re-derive the
+    # summaries of the conversations that lose rows.
+    conversation_ids = await list_user_conversation_ids(user_id, session)
     await session.delete(user)
+    await session.flush()
+    await refresh_conversation_summaries(conversation_ids, session)
     await session.commit()
+    await invalidate_principal(user_id)
+    await inbox.drop_inbox(user_id, conversation_ids)
+    await membership.forget_conversations(conversation_ids)
     return None
@@ -10,6 +10,15 @@ async def get_user_by_id(user_id, session: AsyncSession):
     return result.scalar_one_or_none()
 
 
+async def get_missing_user_ids(user_ids, session: AsyncSession) -> set:
+    """The ids in ``user_ids`` with no user, checked in one query."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return set()
+    result = await session.execute(select(User.id).where(User.id.in_(user_ids)))
+    return user_ids - set(result.scalars().all())
+
+
 async def get_user_by_email(email, session: AsyncSession):
     query = select(User).where(User.email == email)
     result = await session.execute(query)
@@ -0,0 +1,148 @@
+"""Inbox latency as the number of conversations grows.
+
+Seeds an in-memory SQLite database with one user in N conversations and
+times ``list_user_conversations``, which reads the stored summaries, against
+the original per-conversation loop (1 + 3N queries). SQLite has no network
+round-trip, so against Postgres the gap is larger: every query saved is also
+a round-trip saved.
+
+Run from the repository root (settings are read from .env):
+
+    python -m benchmarks.inbox --sizes 10 100 300 --messages 20
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import and_, event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.models.conversation import Conversation
+from app.models.conversation_member import ConversationMember
+from app.models.message import Message
+from app.models.user import User  # noqa: F401  (Base.metadata needs the users table)
+from app.services.conversation import (
+    list_user_conversations,
+    refresh_conversation_summaries,
+)
+
+
+async def per_conversation_inbox(user_id, session: AsyncSession) -> list[dict]:
+    """The old inbox: one query for conversations, then three per conversation."""
+    result = await session.execute(
+        select(Conversation, ConversationMember.last_read_at)
+        .join(ConversationMember, ConversationMember.conversation_id == Conversation.id)
+        .where(ConversationMember.user_id == user_id)
+        .order_by(Conversation.updated_at.desc())
+    )
+    items = []
+    for conversation, last_read_at in result.all():
+        last_message = (
+            await session.execute(
+                select(Message)
+                .where(Message.conversation_id == conversation.id)
+                .order_by(Message.created_at.desc())
+                .limit(1)
+            )
+        ).scalar_one_or_none()
+        unread_filter = and_(
+            Message.conversation_id == conversation.id, Message.sender_id != user_id
+        )
+        if last_read_at is not None:
+            unread_filter = and_(unread_filter, Message.created_at > last_read_at)
+        unread = (
+            await session.execute(select(func.count(Message.id)).where(unread_filter))
+        ).scalar_one()
+        members = (
+            await session.execute(
+                select(func.count(ConversationMember.id)).where(
+                    ConversationMember.conversation_id == conversation.id
+                )
+            )
+        ).scalar_one()
+        items.append((conversation.id, last_message, unread, members))
+    return items
+
+
+async def seed(session: AsyncSession, conversations: int, messages: int):
+    user_id, other_id = uuid4(), uuid4()
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    rows = [Conversation(is_group=True, name=f"group {n}") for n in range(conversations)]
+    session.add_all(rows)
+    await session.flush()
+    for conversation in rows:
+        session.add_all(
+            [
+                ConversationMember(conversation_id=conversation.id, user_id=user_id),
+                ConversationMember(conversation_id=conversation.id, user_id=other_id),
+            ]
+        )
+        session.add_all(
+            Message(
+                conversation_id=conversation.id,
+                sender_id=other_id,
+                content=f"message {m}",
+                created_at=start + timedelta(seconds=m),
+            )
+            for m in range(messages)
+        )
+    await session.flush()
+    await refresh_conversation_summaries([row.id for row in rows], session)
+    await session.commit()
+    return user_id
+
+
+async def measure(session_maker, engine, inbox, user_id, repeat: int) -> tuple[float, int]:
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            async with session_maker() as session:
+                await inbox(user_id, session)
+        elapsed = (time.perf_counter() - started) / repeat
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+    return elapsed, statements // repeat
+
+
+async def run(sizes: list[int], messages: int, repeat: int) -> None:
+    print(f"{'conversations':>13}  {'single query':>18}  {'per conversation':>22}")
+    for size in sizes:
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_maker() as session:
+            user_id = await seed(session, size, messages)
+
+        single = await measure(session_maker, engine, list_user_conversations, user_id, repeat)
+        looped = await measure(session_maker, engine, per_conversation_inbox, user_id, repeat)
+        print(
+            f"{size:>13}  {single[0] * 1000:>8.2f} ms {single[1]:>4} q"
+            f"  {looped[0] * 1000:>12.2f} ms {looped[1]:>4} q"
+        )
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.messages, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
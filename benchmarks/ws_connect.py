@@ -0,0 +1,99 @@
+"""Connect throughput of ConnectionManager during a reconnect storm.
+
+Pre-connects a baseline of sockets, then connects a burst of new sockets
+concurrently and reports how many connects per second completed. Redis is
+replaced by an in-process pub/sub that charges a fixed round-trip time per
+command, so the number reflects how well connects share Redis round-trips.
+
+Run from the repository root (settings are read from .env):
+
+    python -m benchmarks.ws_connect --existing 10000 --burst 2000 --rtt-ms 0.5
+"""
+
+import argparse
+import asyncio
+import time
+from unittest.mock import patch
+from uuid import uuid4
+
+from app.core import ws
+
+
+class SimulatedPubSub:
+    def __init__(self, rtt: float) -> None:
+        self.rtt = rtt
+        self.channels: set[str] = set()
+        self.commands = 0
+
+    async def subscribe(self, *channels: str) -> None:
+        self.commands += 1
+        await asyncio.sleep(self.rtt)
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels: str) -> None:
+        self.commands += 1
+        await asyncio.sleep(self.rtt)
+        self.channels.difference_update(channels)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        await asyncio.sleep(timeout)
+
+
+class SimulatedRedis:
+    def __init__(self, rtt: float) -> None:
+        self.pubsub_instance = SimulatedPubSub(rtt)
+
+    def pubsub(self) -> SimulatedPubSub:
+        return self.pubsub_instance
+
+
+class IdleWebSocket:
+    async def send_text(self, data: str) -> None:
+        pass
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+async def run(existing: int, burst: int, rtt: float, conversations: int) -> None:
+    redis = SimulatedRedis(rtt)
+    with patch.object(ws, "redis_client", redis):
+        manager = ws.ConnectionManager()
+        conversation_ids = [uuid4() for _ in range(conversations)]
+
+        await asyncio.gather(
+            *(
+                manager.connect(conversation_ids[i % conversations], IdleWebSocket())
+                for i in range(existing)
+            )
+        )
+        baseline_commands = redis.pubsub_instance.commands
+
+        # New sockets join fresh conversations, the worst case for SUBSCRIBE traffic.
+        burst_ids = [uuid4() for _ in range(burst)]
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(manager.connect(conversation_id, IdleWebSocket()) for conversation_id in burst_ids)
+        )
+        elapsed = time.perf_counter() - started
+
+    print(f"existing sockets:      {existing}")
+    print(f"burst sockets:         {burst}")
+    print(f"simulated redis rtt:   {rtt * 1000:.2f} ms")
+    print(f"burst duration:        {elapsed * 1000:.1f} ms")
+    print(f"connects per second:   {burst / elapsed:,.0f}")
+    print(f"redis commands used:   {redis.pubsub_instance.commands - baseline_commands}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--existing", type=int, default=10_000)
+    parser.add_argument("--burst", type=int, default=2_000)
+    parser.add_argument("--conversations", type=int, default=5_000)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(run(args.existing, args.burst, args.rtt_ms / 1000, args.conversations))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ from app.main import app
 from app.db.database import Base, get_async_session
 # Ensure this import matches your actual dependency location
 from app.core.auth import get_current_user 
+from app.services import membership
 
 # --- Database Setup ---
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -48,9 +49,48 @@ def mock_redis(mocker):
     redis_mock.get.return_value = None
     redis_mock.set.return_value = True
     redis_mock.delete.return_value = True
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[])
+    redis_mock.pipeline = MagicMock(return_value=pipeline)
     mocker.patch("app.services.user.redis_client", redis_mock)
+    mocker.patch("app.services.principal.redis_client", redis_mock)
     return redis_mock
 
+@pytest.fixture(autouse=True)
+def mock_inbox_redis(mocker):
+    """Keep the inbox index, written by most conversation services, off a real Redis.
+
+    Reads report the index as not built, so the inbox falls back to Postgres.
+    """
+    redis_mock = AsyncMock()
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[0, []])
+    pipeline.evalsha = AsyncMock()
+    redis_mock.pipeline = MagicMock(return_value=pipeline)
+    mocker.patch("app.services.inbox.redis_client", redis_mock)
+    return redis_mock
+
+@pytest.fixture(autouse=True)
+def mock_membership_redis(mocker):
+    """Keep the membership cache off a real Redis and its L1 empty per test.
+
+    Every Redis lookup misses, so checks load membership from the database.
+    """
+    redis_mock = AsyncMock()
+    redis_mock.hmget.return_value = [None, None]
+    redis_mock.get.return_value = None
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[])
+    pipeline.evalsha = AsyncMock()
+    redis_mock.pipeline = MagicMock(return_value=pipeline)
+    mocker.patch("app.services.membership.redis_client", redis_mock)
+    membership.local_cache.clear()
+    yield redis_mock
+    membership.local_cache.clear()
+
 @pytest.fixture
 def mock_user_auth(test_user_data):
     """Return a user object to bypass authentication."""
@@ -0,0 +1,315 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth import get_current_user
+from app.core.security import create_access_token
+from app.models.conversation import Conversation
+from app.models.user import User
+from app.schemas.user import UserUpdate
+from app.services import membership
+from app.services.access import can_access_conversation
+from app.services.conversation import (
+    add_group_member,
+    remove_group_member,
+    update_member_role,
+)
+from app.services.membership import (
+    Membership,
+    get_cached_membership,
+    listen_for_invalidations,
+    local_cache,
+)
+from app.services.user import delete_user_service, update_user_service
+from tests.conftest import test_engine
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __await__(self):
+        return iter(())
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        return [await getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in self._calls]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.strings = {}
+        self.published = []
+        self.reads = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        self.reads += 1
+        return self.strings.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.strings[key] = value
+
+    async def incr(self, key):
+        self.strings[key] = str(int(self.strings.get(key, 0)) + 1)
+        return int(self.strings[key])
+
+    async def hget(self, key, field):
+        self.reads += 1
+        return self.hashes.get(key, {}).get(field)
+
+    async def hmget(self, key, fields):
+        self.reads += 1
+        values = self.hashes.get(key, {})
+        return [values.get(field) for field in fields]
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+            self.strings.pop(key, None)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    async def evalsha(self, sha, numkeys, *keys_and_args):
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        if sha == membership._fill_if_current.sha:
+            key, version_key = keys
+            if self.strings.get(version_key, "") != args[0]:
+                return 0
+            self.hashes[key] = dict(zip(args[2::2], args[3::2]))
+            return 1
+        # The set-if-built script.
+        if keys[0] in self.hashes:
+            self.hashes[keys[0]].update(zip(args[::2], args[1::2]))
+
+
+@pytest.fixture
+def fake_redis(mocker):
+    redis = FakeRedis()
+    mocker.patch("app.services.principal.redis_client", redis)
+    mocker.patch("app.services.membership.redis_client", redis)
+    return redis
+
+
+@pytest.fixture
+def query_count():
+    counter = {"n": 0}
+
+    def count(*args):
+        counter["n"] += 1
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count)
+    yield counter
+    event.remove(test_engine.sync_engine, "before_cursor_execute", count)
+
+
+async def _seed(session: AsyncSession, is_active: bool = True):
+    user = User(
+        email=f"{uuid4()}@example.com",
+        full_name="Member",
+        hashed_password="x",
+        is_active=is_active,
+    )
+    conversation = Conversation(is_group=True, name="group")
+    session.add_all([user, conversation])
+    await session.commit()
+    return user, conversation
+
+
+@pytest.mark.asyncio
+async def test_cold_check_is_one_query_and_warm_check_is_none(
+    db_session: AsyncSession, fake_redis, query_count
+):
+    user, conversation = await _seed(db_session)
+    await add_group_member(conversation.id, user.id, db_session)
+
+    # One query loads the conversation's members and the user's active flag.
+    query_count["n"] = 0
+    assert await can_access_conversation(user.id, conversation.id, db_session) is True
+    assert query_count["n"] == 1
+
+    assert await can_access_conversation(user.id, conversation.id, db_session) is True
+    assert query_count["n"] == 1
+
+
+@pytest.mark.asyncio
+async def test_membership_changes_invalidate_cached_answer(db_session: AsyncSession, fake_redis):
+    user, conversation = await _seed(db_session)
+
+    assert await can_access_conversation(user.id, conversation.id, db_session) is False
+
+    await add_group_member(conversation.id, user.id, db_session)
+    assert await can_access_conversation(user.id, conversation.id, db_session) is True
+
+    await remove_group_member(conversation.id, user.id, db_session)
+    assert await can_access_conversation(user.id, conversation.id, db_session) is False
+
+
+@pytest.mark.asyncio
+async def test_inactive_or_unknown_user_is_denied(db_session: AsyncSession, fake_redis):
+    user, conversation = await _seed(db_session, is_active=False)
+    await add_group_member(conversation.id, user.id, db_session)
+
+    assert await can_access_conversation(user.id, conversation.id, db_session) is False
+    assert await can_access_conversation(uuid4(), conversation.id, db_session) is False
+
+
+@pytest.mark.asyncio
+async def test_deactivation_invalidates_cached_answer(db_session: AsyncSession, fake_redis):
+    user, conversation = await _seed(db_session)
+    await add_group_member(conversation.id, user.id, db_session)
+    assert await can_access_conversation(user.id, conversation.id, db_session) is True
+
+    await update_user_service(user.id, UserUpdate(is_active=False), db_session)
+
+    assert await can_access_conversation(user.id, conversation.id, db_session) is False
+
+
+@pytest.mark.asyncio
+async def test_membership_cache_answers_every_member_from_one_load(
+    db_session: AsyncSession, fake_redis, query_count
+):
+    user, conversation = await _seed(db_session)
+    other, _ = await _seed(db_session)
+    await add_group_member(conversation.id, user.id, db_session)
+    await add_group_member(conversation.id, other.id, db_session)
+
+    query_count["n"] = 0
+    assert (await get_cached_membership(conversation.id, user.id, db_session)).role == "member"
+    assert (await get_cached_membership(conversation.id, other.id, db_session)).role == "member"
+    stranger = await get_cached_membership(conversation.id, uuid4(), db_session)
+    assert stranger.role is None and stranger.is_group
+    missing = await get_cached_membership(uuid4(), user.id, db_session)
+    assert not missing.exists
+    assert query_count["n"] == 2
+
+    # Repeat checks are served by the in-process cache.
+    reads = fake_redis.reads
+    assert (await get_cached_membership(conversation.id, user.id, db_session)).role == "member"
+    assert fake_redis.reads == reads
+
+
+@pytest.mark.asyncio
+async def test_role_change_updates_cache_and_notifies_workers(db_session: AsyncSession, fake_redis):
+    user, conversation = await _seed(db_session)
+    await add_group_member(conversation.id, user.id, db_session)
+    assert (await get_cached_membership(conversation.id, user.id, db_session)).role == "member"
+
+    fake_redis.published.clear()
+    await update_member_role(conversation.id, user.id, "admin", db_session)
+
+    assert fake_redis.published == [("membership:invalidate", str(conversation.id))]
+    assert (await get_cached_membership(conversation.id, user.id, db_session)).role == "admin"
+
+
+@pytest.mark.asyncio
+async def test_warm_principal_costs_no_query_until_user_changes(
+    db_session: AsyncSession, fake_redis, query_count
+):
+    user, _ = await _seed(db_session)
+    token = create_access_token(data={"sub": str(user.id)})
+
+    query_count["n"] = 0
+    assert (await get_current_user(token, db_session)).is_active is True
+    assert query_count["n"] == 1
+    assert (await get_current_user(token, db_session)).id == user.id
+    assert query_count["n"] == 1
+
+    await update_user_service(user.id, UserUpdate(is_superuser=True), db_session)
+    assert (await get_current_user(token, db_session)).is_superuser is True
+
+    await delete_user_service(user.id, db_session)
+    assert f"principal:{user.id}" not in fake_redis.strings
+
+
+@pytest.mark.asyncio
+async def test_fill_racing_a_removal_does_not_restore_the_member(
+    db_session: AsyncSession, fake_redis, mocker
+):
+    user, conversation = await _seed(db_session)
+    await add_group_member(conversation.id, user.id, db_session)
+    load = membership._load
+
+    async def load_then_remove(conversation_id, user_id, session):
+        loaded = await load(conversation_id, user_id, session)
+        await remove_group_member(conversation_id, user_id, session)
+        return loaded
+
+    racing_load = mocker.patch("app.services.membership._load", load_then_remove)
+    assert (await get_cached_membership(conversation.id, user.id, db_session)).role == "member"
+    mocker.stop(racing_load)
+
+    local_cache.clear()
+    assert await can_access_conversation(user.id, conversation.id, db_session) is False
+
+
+class FakePubSub:
+    def __init__(self, *data):
+        self.data = data
+        self.ready = asyncio.Event()
+
+    async def subscribe(self, channel):
+        pass
+
+    async def listen(self):
+        await self.ready.wait()
+        for data in self.data:
+            yield {"type": "message", "data": data}
+        await asyncio.Event().wait()
+
+    async def aclose(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_invalidation_from_another_worker_drops_local_entry(mocker):
+    stale, fresh, user_id = uuid4(), uuid4(), uuid4()
+    pubsub = FakePubSub("not-a-uuid", f"garbage,{stale}")
+    redis = mocker.MagicMock()
+    redis.pubsub.return_value = pubsub
+    mocker.patch("app.services.membership.redis_client", redis)
+
+    listener = asyncio.create_task(listen_for_invalidations())
+    await asyncio.sleep(0)
+    for conversation_id in (stale, fresh):
+        local_cache.put(conversation_id, user_id, Membership("group", "member"))
+    pubsub.ready.set()
+    try:
+        for _ in range(100):
+            if local_cache.get(stale, user_id) is None:
+                break
+            await asyncio.sleep(0.01)
+        assert local_cache.get(stale, user_id) is None
+        assert local_cache.get(fresh, user_id) == Membership("group", "member")
+    finally:
+        listener.cancel()
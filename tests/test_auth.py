@@ -1,9 +1,11 @@
 import pytest
 import asyncio
+import threading
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
-from app.core.security import get_hashed_password
+from app.core.security import PasswordHasherPool, get_hashed_password
+from app.exceptions.auth import PasswordHashingBusyError
 
 @pytest.mark.asyncio
 async def test_register_user(client: AsyncClient, test_user_data: dict):
@@ -46,7 +48,7 @@ async def test_register_weak_password(client: AsyncClient, test_user_data: dict)
 @pytest.mark.asyncio
 async def test_login_success(client: AsyncClient, db_session: AsyncSession, test_user_data: dict):
     """Test successful login."""
-    hashed_password = get_hashed_password(test_user_data["password"])
+    hashed_password = await get_hashed_password(test_user_data["password"])
     user = User(
         email=test_user_data["email"],
         hashed_password=hashed_password,
@@ -70,7 +72,7 @@ async def test_login_success(client: AsyncClient, db_session: AsyncSession, test
 
 @pytest.mark.asyncio
 async def test_login_incorrect_credentials(client: AsyncClient, db_session: AsyncSession, test_user_data: dict):
-    hashed_password = get_hashed_password(test_user_data["password"])
+    hashed_password = await get_hashed_password(test_user_data["password"])
     user = User(
         email=test_user_data["email"],
         hashed_password=hashed_password,
@@ -92,7 +94,7 @@ async def test_login_incorrect_credentials(client: AsyncClient, db_session: Asyn
 @pytest.mark.asyncio
 async def test_refresh_token(client: AsyncClient, db_session: AsyncSession, test_user_data: dict):
     """Test token refresh endpoint."""
-    hashed_password = get_hashed_password(test_user_data["password"])
+    hashed_password = await get_hashed_password(test_user_data["password"])
     user = User(
         email=test_user_data["email"],
         hashed_password=hashed_password,
@@ -127,7 +129,7 @@ async def test_get_current_user(client: AsyncClient, db_session: AsyncSession, t
     Test authenticating with a REAL token (integration test).
     Uses 'client' so no mock auth is injected.
     """
-    hashed_password = get_hashed_password(test_user_data["password"])
+    hashed_password = await get_hashed_password(test_user_data["password"])
     user = User(
         email=test_user_data["email"],
         hashed_password=hashed_password,
@@ -156,4 +158,69 @@ async def test_get_current_user_invalid_token(client: AsyncClient):
         "/api/v1/auth/me",
         headers={"Authorization": "Bearer invalid_token"},
     )
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_password_pool_queues_then_refuses():
+    pool = PasswordHasherPool(workers=1, max_pending=2)
+    release = threading.Event()
+    running = [asyncio.create_task(pool.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert pool.queue_depth == 1
+
+    with pytest.raises(PasswordHashingBusyError):
+        await pool.run(release.wait)
+
+    release.set()
+    assert await asyncio.gather(*running) == [True, True]
+    assert pool.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_password_pool_counts_work_abandoned_by_its_caller():
+    pool = PasswordHasherPool(workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def hash_slowly():
+        started.set()
+        release.wait()
+
+    caller = asyncio.create_task(pool.run(hash_slowly))
+    await asyncio.to_thread(started.wait)
+    caller.cancel()
+    await asyncio.sleep(0)
+
+    # The thread is still hashing, so its slot is still taken.
+    assert pool.pending == 1
+    with pytest.raises(PasswordHashingBusyError):
+        await pool.run(release.wait)
+
+    release.set()
+    for _ in range(100):
+        if pool.pending == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert pool.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_login_is_refused_while_hashing_is_saturated(
+    client: AsyncClient, db_session: AsyncSession, test_user_data: dict, mocker
+):
+    db_session.add(
+        User(
+            email=test_user_data["email"],
+            hashed_password=await get_hashed_password(test_user_data["password"]),
+            full_name=test_user_data["full_name"],
+        )
+    )
+    await db_session.commit()
+    mocker.patch("app.core.security.password_hasher.max_pending", 0)
+
+    response = await client.post(
+        "/api/v1/auth/login",
+        data={"username": test_user_data["email"], "password": test_user_data["password"]},
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
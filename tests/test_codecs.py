@@ -0,0 +1,48 @@
+import pytest
+
+from app.core.codecs import CODECS, JSON_CODEC, FrameCodec, negotiate_codec
+
+
+class FakeWebSocket:
+    def __init__(self, subprotocols):
+        self.scope = {"subprotocols": subprotocols}
+
+
+def test_clients_without_subprotocol_get_json():
+    assert negotiate_codec(FakeWebSocket([])) == (JSON_CODEC, None)
+
+
+def test_first_supported_offer_wins():
+    codec, subprotocol = negotiate_codec(FakeWebSocket(["chat.xml.v1", "chat.json.v1"]))
+
+    assert codec is JSON_CODEC
+    assert subprotocol == "chat.json.v1"
+
+
+def test_unsupported_offers_are_rejected():
+    assert negotiate_codec(FakeWebSocket(["chat.xml.v1"])) is None
+
+
+def test_msgpack_round_trip():
+    msgpack = pytest.importorskip("msgpack")
+    codec = CODECS["chat.msgpack.v1"]
+
+    payload = codec.encode('{"type": "message.new", "message": {"content": "hi"}}')
+
+    assert isinstance(payload, bytes)
+    assert msgpack.unpackb(payload) == {"type": "message.new", "message": {"content": "hi"}}
+    assert codec.decode(msgpack.packb({"type": "typing.start"})) == {"type": "typing.start"}
+    with pytest.raises(ValueError):
+        codec.decode('{"type": "typing.start"}')
+
+
+def test_codec_missing_decode_cannot_be_instantiated():
+    class EncodeOnly(FrameCodec):
+        subprotocol = "chat.encode-only.v1"
+        binary = False
+
+        def encode(self, frame: str) -> str:
+            return frame
+
+    with pytest.raises(TypeError):
+        EncodeOnly()
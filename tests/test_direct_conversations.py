@@ -0,0 +1,52 @@
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.conversation import Conversation
+from app.models.conversation_member import ConversationMember
+from app.services import conversation as conversation_service
+from app.services.conversation import get_or_create_one_to_one_conversation
+
+
+@pytest.mark.asyncio
+async def test_direct_conversation_is_keyed_by_the_pair(db_session: AsyncSession):
+    alice, bob = uuid4(), uuid4()
+
+    created = await get_or_create_one_to_one_conversation(alice, bob, db_session)
+    found = await get_or_create_one_to_one_conversation(bob, alice, db_session)
+    other = await get_or_create_one_to_one_conversation(alice, uuid4(), db_session)
+
+    assert found.id == created.id
+    assert other.id != created.id
+    assert created.member_count == 2
+    members = await db_session.scalar(
+        select(func.count(ConversationMember.id)).where(
+            ConversationMember.conversation_id == created.id
+        )
+    )
+    assert members == 2
+
+
+@pytest.mark.asyncio
+async def test_losing_a_creation_race_returns_the_winner(db_session: AsyncSession, mocker):
+    alice, bob = uuid4(), uuid4()
+    winner = await get_or_create_one_to_one_conversation(alice, bob, db_session)
+
+    # The loser's first lookup ran before the winner committed.
+    lookup = conversation_service.get_one_to_one_conversation_between
+    calls = []
+
+    async def racing_lookup(*args):
+        calls.append(args)
+        return None if len(calls) == 1 else await lookup(*args)
+
+    mocker.patch.object(
+        conversation_service, "get_one_to_one_conversation_between", side_effect=racing_lookup
+    )
+
+    loser = await get_or_create_one_to_one_conversation(bob, alice, db_session)
+
+    assert loser.id == winner.id
+    assert await db_session.scalar(select(func.count(Conversation.id))) == 1
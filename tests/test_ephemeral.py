@@ -0,0 +1,41 @@
+from uuid import uuid4
+
+import pytest
+
+from app.services.ephemeral import EventCoalescer, get_presence
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_repeated_typing_pings_coalesce_within_window():
+    clock = FakeClock()
+    coalescer = EventCoalescer(window=3, clock=clock)
+    key = ("typing", uuid4())
+
+    assert coalescer.should_send(key, "typing.start") is True
+    clock.now = 1
+    assert coalescer.should_send(key, "typing.start") is False
+    clock.now = 2
+    assert coalescer.should_send(key, "typing.stop") is True
+    assert coalescer.should_send(key, "typing.start") is True
+    clock.now = 5.5
+    assert coalescer.should_send(key, "typing.start") is True
+
+
+@pytest.mark.asyncio
+async def test_get_presence_uses_one_mget(mocker):
+    redis_mock = mocker.AsyncMock()
+    online, away, offline = uuid4(), uuid4(), uuid4()
+    redis_mock.mget.return_value = ["online", "away", None]
+    mocker.patch("app.services.ephemeral.redis_client", redis_mock)
+
+    presence = await get_presence([online, away, offline])
+
+    assert presence == {online: "online", away: "away"}
+    redis_mock.mget.assert_awaited_once()
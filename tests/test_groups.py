@@ -0,0 +1,125 @@
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User
+from app.services.conversation import (
+    add_group_member,
+    add_group_members,
+    create_group_conversation,
+    get_conversation_members,
+    remove_group_member,
+)
+from app.services.membership import Membership, local_cache
+from app.utils.user import get_missing_user_ids
+from tests.conftest import test_engine
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def listener(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", listener)
+    yield executed
+    event.remove(test_engine.sync_engine, "before_cursor_execute", listener)
+
+
+@pytest.mark.asyncio
+async def test_missing_users_are_found_in_one_query(db_session: AsyncSession, statements):
+    users = [
+        User(email=f"user{n}@example.com", full_name=f"User {n}", hashed_password="x")
+        for n in range(3)
+    ]
+    db_session.add_all(users)
+    await db_session.commit()
+    unknown = uuid4()
+
+    statements.clear()
+    missing = await get_missing_user_ids([user.id for user in users] + [unknown], db_session)
+
+    assert missing == {unknown}
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_large_group_members_are_inserted_in_one_statement(
+    db_session: AsyncSession, statements
+):
+    creator_id = uuid4()
+    member_ids = [uuid4() for _ in range(500)]
+
+    statements.clear()
+    conversation = await create_group_conversation(
+        creator_id, "big", None, None, member_ids + [creator_id], db_session
+    )
+
+    member_inserts = [s for s in statements if s.startswith("INSERT INTO conversation_members")]
+    assert len(member_inserts) == 1
+    assert conversation.member_count == 501
+    members = await get_conversation_members(conversation.id, db_session)
+    assert {member.user_id for member in members} == {creator_id, *member_ids}
+    assert [m.role for m in members if m.user_id == creator_id] == ["owner"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_add_skips_existing_members(db_session: AsyncSession, mock_redis):
+    creator_id, existing_id = uuid4(), uuid4()
+    conversation = await create_group_conversation(
+        creator_id, "group", None, None, [existing_id], db_session
+    )
+    new_ids = [uuid4() for _ in range(50)]
+
+    added = await add_group_members(conversation.id, [existing_id, *new_ids], db_session)
+
+    assert {member.user_id for member in added} == set(new_ids)
+    assert all(member.joined_at is not None for member in added)
+    await db_session.refresh(conversation)
+    assert conversation.member_count == 52
+    assert await add_group_members(conversation.id, new_ids, db_session) == []
+
+
+@pytest.mark.asyncio
+async def test_adding_an_existing_member_is_a_conflict_despite_a_stale_cache(
+    authorized_client: AsyncClient, db_session: AsyncSession, mock_user_auth
+):
+    owner, member = (
+        User(email=f"{name}@example.com", full_name=name, hashed_password="x")
+        for name in ("owner", "member")
+    )
+    db_session.add_all([owner, member])
+    await db_session.commit()
+    conversation = await create_group_conversation(
+        owner.id, "group", None, None, [member.id], db_session
+    )
+    mock_user_auth.id = owner.id
+    local_cache.put(conversation.id, member.id, Membership("group", None))
+
+    response = await authorized_client.post(
+        f"/api/v1/chat/groups/{conversation.id}/members", json={"user_id": str(member.id)}
+    )
+
+    assert response.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_member_changes_tolerate_a_conversation_deleted_meanwhile(
+    db_session: AsyncSession, mocker
+):
+    creator_id, user_id = uuid4(), uuid4()
+    conversation = await create_group_conversation(
+        creator_id, "group", None, None, [], db_session
+    )
+    mocker.patch.object(db_session, "get", mocker.AsyncMock(return_value=None))
+    update_inboxes = mocker.patch("app.services.conversation.inbox.update_inboxes")
+
+    await add_group_member(conversation.id, user_id, db_session)
+    await add_group_members(conversation.id, [uuid4()], db_session)
+    await remove_group_member(conversation.id, user_id, db_session)
+
+    update_inboxes.assert_not_called()
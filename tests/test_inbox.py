@@ -0,0 +1,351 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.conversation import Conversation
+from app.models.conversation_member import ConversationMember
+from app.models.message import Message
+from app.services import inbox
+from app.services.conversation import (
+    add_group_member,
+    create_group_conversation,
+    get_user_inbox,
+    list_user_conversations,
+    mark_conversation_read,
+    refresh_conversation_summaries,
+    remove_group_member,
+)
+from app.services.message import create_message
+from app.services.message_writer import MessageWriter
+from tests.conftest import TestSessionLocal, test_engine
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __await__(self):
+        return iter(())
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        calls, self._calls = self._calls, []
+        return [await getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+
+class FakeRedis:
+    """The commands the inbox index uses, with its touch script done in Python."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def expire(self, key, seconds):
+        return key in self.data
+
+    async def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    async def zrem(self, key, member):
+        self.data.get(key, {}).pop(member, None)
+
+    async def zrevrange(self, key, start, end):
+        scores = self.data.get(key, {})
+        return sorted(scores, key=scores.get, reverse=True)[start:end + 1]
+
+    async def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.data.get(key, {}).pop(field, None)
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def hmget(self, key, fields):
+        values = self.data.get(key, {})
+        return [values.get(field) for field in fields]
+
+    async def evalsha(self, sha, numkeys, *keys_and_args):
+        if sha == inbox._store_summary.sha:
+            return self._store_summary(*keys_and_args)
+        return self._touch(*keys_and_args)
+
+    def _store_summary(self, key, score, mode, ttl, *fields):
+        stored = self.data.get(key, {}).get("score")
+        if stored is not None and (
+            float(stored) > score or (float(stored) == score and mode == "fill")
+        ):
+            return 0
+        self.data[key] = {"score": str(score), **dict(zip(fields[::2], fields[1::2]))}
+        return 1
+
+    def _touch(self, inbox_key, unread_key, member, score, mode, value):
+        if inbox_key not in self.data:
+            return 0
+        scores = self.data[inbox_key]
+        scores[member] = max(scores.get(member, score), score)
+        unread = self.data.setdefault(unread_key, {})
+        if mode == "set":
+            unread[member] = str(value)
+        elif mode == "forget":
+            unread.pop(member, None)
+        elif member in unread:
+            unread[member] = str(int(unread[member]) + value)
+        return 1
+
+
+@pytest.fixture
+def fake_redis(mocker):
+    redis = FakeRedis()
+    mocker.patch("app.services.inbox.redis_client", redis)
+    return redis
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def listener(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", listener)
+    yield executed
+    event.remove(test_engine.sync_engine, "before_cursor_execute", listener)
+
+
+@pytest.mark.asyncio
+async def test_inbox_is_one_query_regardless_of_size(db_session: AsyncSession):
+    user_id, other_id = uuid4(), uuid4()
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    conversations = [Conversation(is_group=True, name=f"group {n}") for n in range(20)]
+    db_session.add_all(conversations)
+    await db_session.flush()
+    for n, conversation in enumerate(conversations):
+        db_session.add_all(
+            [
+                ConversationMember(conversation_id=conversation.id, user_id=user_id),
+                ConversationMember(conversation_id=conversation.id, user_id=other_id),
+            ]
+        )
+        db_session.add_all(
+            Message(
+                conversation_id=conversation.id,
+                sender_id=other_id,
+                content=f"message {m}",
+                created_at=start + timedelta(seconds=m),
+            )
+            for m in range(n % 3)
+        )
+    await db_session.flush()
+    await refresh_conversation_summaries([c.id for c in conversations], db_session)
+    await db_session.commit()
+
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        items = await list_user_conversations(user_id, db_session)
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 1
+    assert len(items) == 20
+    by_id = {item["id"]: item for item in items}
+    for n, conversation in enumerate(conversations):
+        item = by_id[conversation.id]
+        assert item["member_count"] == 2
+        assert item["unread_count"] == n % 3
+        assert item["last_message"] == (f"message {n % 3 - 1}" if n % 3 else None)
+        assert (item["last_message_at"] is None) == (n % 3 == 0)
+
+
+@pytest.mark.asyncio
+async def test_summary_is_maintained_on_write(db_session: AsyncSession, mock_redis):
+    user_id, other_id = uuid4(), uuid4()
+    quiet = Conversation(is_group=True, name="quiet")
+    busy = Conversation(is_group=True, name="busy")
+    db_session.add_all([quiet, busy])
+    await db_session.commit()
+    for conversation in (quiet, busy):
+        await add_group_member(conversation.id, user_id, db_session)
+    await add_group_member(busy.id, other_id, db_session)
+
+    await create_message(quiet.id, other_id, "hello", db_session)
+    await create_message(busy.id, other_id, "x" * 500, db_session)
+
+    items = await list_user_conversations(user_id, db_session)
+    assert [item["name"] for item in items] == ["busy", "quiet"]
+    assert items[0]["last_message"] == "x" * 200
+    assert items[0]["member_count"] == 2
+    assert items[1]["member_count"] == 1
+
+    await remove_group_member(busy.id, other_id, db_session)
+    await create_message(quiet.id, other_id, "again", db_session)
+
+    items = await list_user_conversations(user_id, db_session)
+    assert [item["name"] for item in items] == ["quiet", "busy"]
+    assert items[0]["last_message"] == "again"
+    assert items[1]["member_count"] == 1
+    await db_session.refresh(quiet)
+    assert quiet.message_count == 2
+
+
+@pytest.mark.asyncio
+async def test_writer_batch_updates_each_summary_once(db_session: AsyncSession):
+    sender_id = uuid4()
+    conversations = [Conversation(is_group=True, name=f"group {n}") for n in range(2)]
+    db_session.add_all(conversations)
+    await db_session.commit()
+
+    writer = MessageWriter(
+        session_maker=TestSessionLocal,
+        max_batch_size=5,
+        max_delay=1,
+    )
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            statements.append(executemany)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        messages = await asyncio.gather(
+            *(
+                writer.write(conversations[n % 2].id, sender_id, f"message {n}")
+                for n in range(5)
+            )
+        )
+        await writer.join()
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", listener)
+
+    assert statements == [True]
+    for conversation in conversations:
+        await db_session.refresh(conversation)
+    assert [c.message_count for c in conversations] == [3, 2]
+    assert conversations[0].last_message_id == messages[4].id
+    assert conversations[1].last_message_preview == "message 3"
+
+
+@pytest.mark.asyncio
+async def test_inbox_is_served_from_redis_once_built(
+    db_session: AsyncSession, fake_redis, statements
+):
+    user_id, other_id = uuid4(), uuid4()
+    first = await create_group_conversation(user_id, "first", None, None, [other_id], db_session)
+    second = await create_group_conversation(user_id, "second", None, None, [other_id], db_session)
+    await create_message(first.id, other_id, "hello", db_session)
+    await create_message(second.id, other_id, "hi", db_session)
+
+    statements.clear()
+    cold = await get_user_inbox(user_id, db_session)
+    assert len(statements) == 1
+    assert [item["name"] for item in cold] == ["second", "first"]
+
+    statements.clear()
+    warm = await get_user_inbox(user_id, db_session)
+    assert statements == []
+    assert warm == cold
+
+    # A new message reorders the cached inbox and bumps the unread count.
+    await create_message(first.id, other_id, "newer", db_session)
+    statements.clear()
+    items = await get_user_inbox(user_id, db_session)
+    assert statements == []
+    assert [item["name"] for item in items] == ["first", "second"]
+    assert items[0]["last_message"] == "newer"
+    assert items[0]["unread_count"] == 2
+    assert items[0]["member_count"] == 2
+
+    # Reading drops the cached count; only that conversation is reloaded.
+    await mark_conversation_read(first.id, user_id, db_session)
+    statements.clear()
+    items = await get_user_inbox(user_id, db_session)
+    assert len(statements) == 1
+    assert [item["unread_count"] for item in items] == [0, 1]
+
+    statements.clear()
+    page = await get_user_inbox(user_id, db_session, offset=1, limit=1)
+    assert statements == []
+    assert [item["name"] for item in page] == ["second"]
+
+
+def _summary(conversation_id, updated_at, last_message):
+    return {
+        "id": conversation_id,
+        "is_group": True,
+        "name": "group",
+        "created_at": updated_at,
+        "updated_at": updated_at,
+        "last_message": last_message,
+        "member_count": 2,
+        "unread_count": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_never_replaces_a_newer_summary(fake_redis):
+    user_id, conversation_id = uuid4(), uuid4()
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    old = _summary(conversation_id, start, "old")
+    new = _summary(conversation_id, start + timedelta(seconds=1), "new")
+
+    await inbox.update_inboxes([new])
+    await inbox.store_inbox(user_id, [old])
+    await inbox.update_inboxes([old], mode=inbox.SUMMARY_FILL)
+    await inbox.update_inboxes([old])
+
+    ids, items = await inbox.read_page(user_id, 0, 10)
+    assert ids == [conversation_id]
+    assert items[conversation_id]["last_message"] == "new"
+
+    # An update as new as the stored summary applies; a fill does not.
+    await inbox.update_inboxes([{**new, "member_count": 3}])
+    await inbox.update_inboxes([{**new, "member_count": 4}], mode=inbox.SUMMARY_FILL)
+    _, items = await inbox.read_page(user_id, 0, 10)
+    assert items[conversation_id]["member_count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_emptied_inbox_drops_its_index_and_unknown_touches_are_skipped(fake_redis):
+    user_id, conversation_id = uuid4(), uuid4()
+    item = _summary(conversation_id, datetime(2026, 1, 1, tzinfo=UTC), "hi")
+    await inbox.store_inbox(user_id, [item])
+
+    await inbox.update_inboxes([], [(user_id, uuid4(), inbox.UNREAD_ADD, 1)])
+    assert (await inbox.read_page(user_id, 0, 10))[0] == [conversation_id]
+
+    await inbox.store_inbox(user_id, [])
+    assert await inbox.read_page(user_id, 0, 10) is None
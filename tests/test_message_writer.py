@@ -0,0 +1,92 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.message import Message
+from app.services.message_writer import MessageWriter
+from tests.conftest import TestSessionLocal, test_engine
+
+
+@pytest.fixture
+def commit_counter(db_session: AsyncSession):
+    commits = []
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    event.listen(test_engine.sync_engine, "commit", on_commit)
+    yield commits
+    event.remove(test_engine.sync_engine, "commit", on_commit)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_one_transaction(db_session: AsyncSession, commit_counter):
+    writer = MessageWriter(session_maker=TestSessionLocal, max_batch_size=100, max_delay=0.01)
+    conversation_id, sender_id = uuid4(), uuid4()
+
+    messages = await asyncio.gather(
+        *(writer.write(conversation_id, sender_id, f"message {n}") for n in range(20))
+    )
+    await writer.join()
+
+    assert len(commit_counter) == 1
+    assert [message.content for message in messages] == [f"message {n}" for n in range(20)]
+    assert all(message.created_at is not None for message in messages)
+
+    count = await db_session.scalar(select(func.count(Message.id)))
+    assert count == 20
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_without_waiting_for_delay(db_session: AsyncSession, commit_counter):
+    writer = MessageWriter(session_maker=TestSessionLocal, max_batch_size=5, max_delay=60)
+    conversation_id, sender_id = uuid4(), uuid4()
+
+    messages = await asyncio.wait_for(
+        asyncio.gather(*(writer.write(conversation_id, sender_id, str(n)) for n in range(5))),
+        timeout=5,
+    )
+    await writer.join()
+
+    assert len(messages) == 5
+    assert len(commit_counter) == 1
+
+
+@pytest.mark.asyncio
+async def test_bad_row_fails_only_its_own_writer(db_session: AsyncSession):
+    writer = MessageWriter(session_maker=TestSessionLocal, max_batch_size=100, max_delay=0.01)
+    conversation_id, sender_id = uuid4(), uuid4()
+
+    results = await asyncio.gather(
+        writer.write(conversation_id, sender_id, "first"),
+        writer.write(conversation_id, sender_id, None),
+        writer.write(conversation_id, sender_id, "third"),
+        return_exceptions=True,
+    )
+    await writer.join()
+
+    assert [message.content for message in results[::2]] == ["first", "third"]
+    assert isinstance(results[1], IntegrityError)
+    count = await db_session.scalar(select(func.count(Message.id)))
+    assert count == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_commit_releases_its_writers(mocker):
+    writer = MessageWriter(session_maker=TestSessionLocal, max_batch_size=1, max_delay=60)
+
+    async def hang(rows):
+        await asyncio.Event().wait()
+
+    mocker.patch.object(writer, "_insert", hang)
+    write = asyncio.create_task(writer.write(uuid4(), uuid4(), "hello"))
+    await asyncio.sleep(0.01)
+    for task in list(writer._commit_tasks):
+        task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(write, timeout=1)
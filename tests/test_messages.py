@@ -0,0 +1,67 @@
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.message import Message
+from app.services.message import get_messages_after, get_messages_for_conversation
+
+
+async def _seed_messages(session: AsyncSession, conversation_id, count: int) -> list[Message]:
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    messages = [
+        Message(
+            conversation_id=conversation_id,
+            sender_id=uuid4(),
+            content=f"message {n}",
+            created_at=start + timedelta(seconds=n),
+        )
+        for n in range(count)
+    ]
+    session.add_all(messages)
+    await session.commit()
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_get_messages_after_returns_gap_oldest_first(db_session: AsyncSession):
+    conversation_id = uuid4()
+    messages = await _seed_messages(db_session, conversation_id, 5)
+
+    gap = await get_messages_after(conversation_id, messages[1].id, 10, db_session)
+
+    assert [message.content for message in gap] == ["message 2", "message 3", "message 4"]
+
+
+@pytest.mark.asyncio
+async def test_get_messages_after_unknown_cursor(db_session: AsyncSession):
+    conversation_id = uuid4()
+    messages = await _seed_messages(db_session, conversation_id, 2)
+
+    assert await get_messages_after(conversation_id, uuid4(), 10, db_session) is None
+    assert await get_messages_after(uuid4(), messages[0].id, 10, db_session) is None
+
+
+@pytest.mark.asyncio
+async def test_history_pages_newest_first_by_cursor(db_session: AsyncSession):
+    conversation_id = uuid4()
+    messages = await _seed_messages(db_session, conversation_id, 7)
+
+    async def page(**cursor):
+        result = await get_messages_for_conversation(conversation_id, 3, db_session, **cursor)
+        return [message.content for message in result]
+
+    assert await page() == ["message 6", "message 5", "message 4"]
+    assert await page(before=messages[4].id) == ["message 3", "message 2", "message 1"]
+    assert await page(before=messages[1].id) == ["message 0"]
+    assert await page(after=messages[1].id) == ["message 4", "message 3", "message 2"]
+    assert await page(after=messages[6].id) == []
+
+
+@pytest.mark.asyncio
+async def test_history_rejects_cursor_from_another_conversation(db_session: AsyncSession):
+    messages = await _seed_messages(db_session, uuid4(), 1)
+
+    assert await get_messages_for_conversation(uuid4(), 10, db_session, before=messages[0].id) is None
+    assert await get_messages_for_conversation(uuid4(), 10, db_session, after=uuid4()) is None
@@ -0,0 +1,58 @@
+import pytest
+
+from app.core.metrics import Counter, Gauge, Histogram, MetricsRegistry, _Metric
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    sent = Counter("sent_total", "Frames sent.", registry=registry)
+    failures = Counter("failures_total", "Failures.", labelnames=("reason",), registry=registry)
+    Gauge("depth", "Queue depth.", callback=lambda: 7, registry=registry)
+    latency = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+
+    sent.inc()
+    sent.inc(2)
+    failures.labels("queue_full").inc()
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE sent_total counter" in lines
+    assert "sent_total 3.0" in lines
+    assert 'failures_total{reason="queue_full"} 1.0' in lines
+    assert "depth 7.0" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_count 3" in lines
+
+
+def test_labelled_callback_gauge_is_rebuilt_on_each_scrape():
+    registry = MetricsRegistry()
+    sizes = {("small",): 2, ("large",): 1}
+    Gauge("rooms", "Rooms by size.", labelnames=("size",), callback=lambda: sizes, registry=registry)
+
+    assert 'rooms{size="large"} 1.0' in registry.render().splitlines()
+    sizes = {("small",): 3}
+    lines = registry.render().splitlines()
+    assert 'rooms{size="small"} 3.0' in lines
+    assert not any(line.startswith('rooms{size="large"}') for line in lines)
+
+
+def test_metric_missing_an_override_cannot_be_instantiated():
+    class Incomplete(_Metric):
+        type_name = "gauge"
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "Never rendered.", registry=MetricsRegistry())
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client):
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE chat_ws_connections gauge" in response.text
+    assert "chat_ws_delivery_latency_seconds_bucket" in response.text
@@ -0,0 +1,64 @@
+from uuid import uuid4
+
+import pytest
+
+from app.api.v1 import chat_ws
+from app.core.rate_limit import TokenBucket
+from app.schemas.ws import WSMessageIn
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_burst_then_throttles():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(0.5)
+
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+    for _ in range(3):
+        bucket.acquire()
+
+    clock.now = 0.5
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(0.5)
+
+    clock.now = 100
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+
+def test_refund_returns_a_token_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=1, clock=clock)
+
+    assert bucket.acquire() == 0.0
+    bucket.refund()
+    bucket.refund()
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(0.5)
+
+
+@pytest.mark.asyncio
+async def test_user_limit_rejection_keeps_the_socket_burst(mocker):
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock)
+    mocker.patch.object(chat_ws.user_send_limiter, "acquire", mocker.AsyncMock(return_value=2.0))
+    write = mocker.patch.object(chat_ws.message_writer, "write")
+    connection = mocker.MagicMock()
+
+    message_in = WSMessageIn(type="message.send", conversation_id=uuid4(), content="hi")
+    await chat_ws._send_message(connection, bucket, uuid4(), uuid4(), message_in)
+
+    assert '"retry_after":2.0' in connection.send.call_args.args[0]
+    write.assert_not_called()
+    assert bucket.acquire() == 0.0
@@ -0,0 +1,93 @@
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.conversation import Conversation
+from app.models.conversation_member import ConversationMember
+from app.models.message import Message
+from app.services.conversation import list_user_conversations, mark_conversation_read
+
+
+async def _seed(session: AsyncSession, count: int):
+    reader, sender = uuid4(), uuid4()
+    conversation = Conversation(is_group=True, name="group")
+    session.add(conversation)
+    await session.flush()
+    session.add_all(
+        [
+            ConversationMember(conversation_id=conversation.id, user_id=reader),
+            ConversationMember(conversation_id=conversation.id, user_id=sender),
+        ]
+    )
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    messages = [
+        Message(
+            conversation_id=conversation.id,
+            sender_id=sender,
+            content=f"message {n}",
+            created_at=start + timedelta(seconds=n),
+        )
+        for n in range(count)
+    ]
+    session.add_all(messages)
+    await session.commit()
+    return conversation, reader, sender, messages
+
+
+async def _unread(user_id, session: AsyncSession) -> int:
+    [item] = await list_user_conversations(user_id, session)
+    return item["unread_count"]
+
+
+@pytest.mark.asyncio
+async def test_unread_count_is_per_member(db_session: AsyncSession):
+    conversation, reader, sender, messages = await _seed(db_session, 5)
+
+    assert await _unread(reader, db_session) == 5
+    assert await _unread(sender, db_session) == 0
+
+    membership = await mark_conversation_read(
+        conversation.id, reader, db_session, message_id=messages[2].id
+    )
+
+    assert membership.last_read_message_id == messages[2].id
+    assert await _unread(reader, db_session) == 2
+
+
+@pytest.mark.asyncio
+async def test_mark_read_defaults_to_newest_and_never_moves_back(db_session: AsyncSession):
+    conversation, reader, _, messages = await _seed(db_session, 3)
+
+    membership = await mark_conversation_read(conversation.id, reader, db_session)
+    assert membership.last_read_message_id == messages[-1].id
+    assert await _unread(reader, db_session) == 0
+
+    assert (
+        await mark_conversation_read(conversation.id, reader, db_session, message_id=messages[0].id)
+        is None
+    )
+    assert await mark_conversation_read(conversation.id, uuid4(), db_session) is None
+
+
+@pytest.mark.asyncio
+async def test_unread_count_splits_messages_sharing_the_cursor_timestamp(db_session: AsyncSession):
+    conversation, reader, sender, messages = await _seed(db_session, 1)
+    tied = [
+        Message(
+            conversation_id=conversation.id,
+            sender_id=sender,
+            content=f"tied {n}",
+            created_at=messages[0].created_at,
+        )
+        for n in range(3)
+    ]
+    db_session.add_all(tied)
+    await db_session.commit()
+    ordered = sorted([messages[0], *tied], key=lambda message: message.id)
+
+    await mark_conversation_read(conversation.id, reader, db_session, message_id=ordered[1].id)
+
+    # Same created_at as the cursor: only the ids after it are unread.
+    assert await _unread(reader, db_session) == 2
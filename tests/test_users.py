@@ -28,7 +28,7 @@ async def test_get_all_users(authorized_client: AsyncClient, db_session: AsyncSe
     for i in range(3):
         user = User(
             email=f"user{i}@example.com",
-            hashed_password=get_hashed_password("Test123!@#"),
+            hashed_password=await get_hashed_password("Test123!@#"),
             full_name=f"User {i}",
         )
         db_session.add(user)
@@ -45,7 +45,7 @@ async def test_get_single_user(authorized_client: AsyncClient, db_session: Async
     """Test getting a single user by ID."""
     user = User(
         email="single@example.com",
-        hashed_password=get_hashed_password("Test123!@#"),
+        hashed_password=await get_hashed_password("Test123!@#"),
         full_name="Single User",
     )
     db_session.add(user)
@@ -74,7 +74,7 @@ async def test_update_user(
     """Test updating a user."""
     user = User(
         email=test_user_data["email"],
-        hashed_password=get_hashed_password(test_user_data["password"]),
+        hashed_password=await get_hashed_password(test_user_data["password"]),
         full_name=test_user_data["full_name"],
     )
     db_session.add(user)
@@ -98,7 +98,7 @@ async def test_delete_user(
     """Test deleting a user."""
     user = User(
         email=test_user_data["email"],
-        hashed_password=get_hashed_password(test_user_data["password"]),
+        hashed_password=await get_hashed_password(test_user_data["password"]),
         full_name=test_user_data["full_name"],
     )
     db_session.add(user)
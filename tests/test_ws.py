@@ -0,0 +1,454 @@
+import asyncio
+import json
+import signal
+from uuid import uuid4
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.core.codecs import JSON_CODEC, JSONCodec
+from app.core.config import settings
+from app.core.ws import BROADCAST_FAILURES, ConnectionManager
+
+
+class FakePubSub:
+    def __init__(self):
+        self.channels = set()
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.subscribe_calls = 0
+        self.closed = False
+
+    async def subscribe(self, *channels):
+        self.subscribe_calls += 1
+        await asyncio.sleep(0)
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels):
+        self.channels.difference_update(channels)
+
+    async def aclose(self):
+        self.closed = True
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except TimeoutError:
+            return None
+
+    def publish(self, channel, data):
+        if channel in self.channels:
+            self.messages.put_nowait({"type": "message", "channel": channel, "data": data})
+
+
+class FakeRedis:
+    def __init__(self):
+        self.pubsub_calls = 0
+        self.pubsub_instance = FakePubSub()
+        self.streams = {}
+
+    async def xrevrange(self, name, max="+", min="-", count=None):
+        entries = list(reversed(self.streams.get(name, [])))
+        if max.startswith("("):
+            upper = int(max[1:].split("-")[0])
+            entries = [entry for entry in entries if int(entry[0].split("-")[0]) < upper]
+        return entries[:count]
+
+    async def publish(self, channel, data):
+        self.pubsub_instance.publish(channel, data)
+
+    def pubsub(self):
+        self.pubsub_calls += 1
+        return self.pubsub_instance
+
+
+class FakeWebSocket:
+    def __init__(self, stalled=False):
+        self.sent = []
+        self.close_code = None
+        self._stalled = stalled
+
+    async def send_text(self, data):
+        if self._stalled:
+            await asyncio.Event().wait()
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+@pytest.fixture
+def fake_redis(mocker):
+    redis = FakeRedis()
+    mocker.patch("app.core.ws.redis_client", redis)
+    return redis
+
+
+async def _drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_single_pubsub_shared_by_all_conversations(fake_redis):
+    manager = ConnectionManager()
+    conversation_ids = [uuid4() for _ in range(20)]
+
+    for conversation_id in conversation_ids:
+        await manager.connect(conversation_id, FakeWebSocket())
+
+    assert fake_redis.pubsub_calls == 1
+    assert fake_redis.pubsub_instance.channels == {
+        f"conversation:{conversation_id}" for conversation_id in conversation_ids
+    }
+
+
+@pytest.mark.asyncio
+async def test_messages_dispatched_to_matching_conversation(fake_redis):
+    manager = ConnectionManager()
+    first, second = uuid4(), uuid4()
+    first_ws, second_ws = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(first, first_ws)
+    await manager.connect(second, second_ws)
+
+    fake_redis.pubsub_instance.publish(f"conversation:{first}", '{"n": 1}')
+    await _drain()
+
+    assert first_ws.sent == ['{"n": 1}']
+    assert second_ws.sent == []
+
+
+@pytest.mark.asyncio
+async def test_last_disconnect_unsubscribes_channel(fake_redis):
+    manager = ConnectionManager()
+    conversation_id = uuid4()
+    first = await manager.connect(conversation_id, FakeWebSocket())
+    second = await manager.connect(conversation_id, FakeWebSocket())
+
+    await manager.disconnect(first)
+    await _drain()
+    assert f"conversation:{conversation_id}" in fake_redis.pubsub_instance.channels
+
+    await manager.disconnect(second)
+    await _drain()
+    assert fake_redis.pubsub_instance.channels == set()
+
+
+@pytest.mark.asyncio
+async def test_stalled_socket_does_not_block_other_members(fake_redis):
+    manager = ConnectionManager(max_queue_size=2, send_timeout=10)
+    conversation_id = uuid4()
+    stalled_ws, healthy_ws = FakeWebSocket(stalled=True), FakeWebSocket()
+    await manager.connect(conversation_id, stalled_ws)
+    await manager.connect(conversation_id, healthy_ws)
+
+    for n in range(4):
+        await manager.broadcast(conversation_id, f'{{"n": {n}}}')
+        await _drain()
+
+    assert healthy_ws.sent == [f'{{"n": {n}}}' for n in range(4)]
+    assert stalled_ws.close_code == 1008
+    assert f"conversation:{conversation_id}" in fake_redis.pubsub_instance.channels
+
+
+@pytest.mark.asyncio
+async def test_send_timeout_evicts_socket(fake_redis):
+    manager = ConnectionManager(send_timeout=0.01)
+    conversation_id = uuid4()
+    stalled_ws = FakeWebSocket(stalled=True)
+    await manager.connect(conversation_id, stalled_ws)
+
+    await manager.broadcast(conversation_id, '{"n": 1}')
+    await asyncio.sleep(0.05)
+
+    assert stalled_ws.close_code == 1008
+    assert fake_redis.pubsub_instance.channels == set()
+
+
+@pytest.mark.asyncio
+async def test_published_frame_reaches_every_socket_unchanged(fake_redis):
+    manager = ConnectionManager()
+    conversation_id = uuid4()
+    sockets = [FakeWebSocket() for _ in range(3)]
+    for websocket in sockets:
+        await manager.connect(conversation_id, websocket)
+
+    frame = '{"type": "message.new"}'
+    await manager.publish(conversation_id, frame)
+    await _drain()
+
+    assert all(websocket.sent[0] is frame for websocket in sockets)
+
+
+@pytest.mark.asyncio
+async def test_one_connection_subscribed_to_many_conversations(fake_redis):
+    manager = ConnectionManager()
+    first, second = uuid4(), uuid4()
+    websocket = FakeWebSocket()
+    connection = manager.register(websocket)
+
+    await manager.subscribe(connection, first, second)
+    await manager.publish(first, "a")
+    await manager.publish(second, "b")
+    await _drain()
+    assert sorted(websocket.sent) == ["a", "b"]
+
+    await manager.unsubscribe(connection, first)
+    await _drain()
+    assert fake_redis.pubsub_instance.channels == {f"conversation:{second}"}
+
+    await manager.disconnect(connection)
+    await _drain()
+    assert fake_redis.pubsub_instance.channels == set()
+    assert connection.conversation_ids == set()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_connects_share_subscribe_round_trips(fake_redis):
+    manager = ConnectionManager()
+    conversation_ids = [uuid4() for _ in range(50)]
+
+    await asyncio.gather(
+        *(manager.connect(conversation_id, FakeWebSocket()) for conversation_id in conversation_ids)
+    )
+
+    assert fake_redis.pubsub_instance.subscribe_calls <= 2
+    assert len(fake_redis.pubsub_instance.channels) == 50
+
+
+@pytest.mark.asyncio
+async def test_resubscribe_while_unsubscribe_in_flight(fake_redis):
+    manager = ConnectionManager()
+    conversation_id = uuid4()
+    first = await manager.connect(conversation_id, FakeWebSocket())
+
+    await manager.disconnect(first)
+    await asyncio.sleep(0)
+    websocket = FakeWebSocket()
+    await manager.connect(conversation_id, websocket)
+    await _drain()
+
+    assert fake_redis.pubsub_instance.channels == {f"conversation:{conversation_id}"}
+
+
+@pytest.mark.asyncio
+async def test_release_sends_replay_before_held_frames_without_duplicates(fake_redis):
+    manager = ConnectionManager()
+    websocket = FakeWebSocket()
+    connection = manager.register(websocket)
+
+    connection.hold()
+    connection.send("m2")
+    connection.send("m3")
+    connection.release(["m1", "m2"])
+    await _drain()
+
+    assert websocket.sent == ["m1", "m2", "m3"]
+
+
+@pytest.mark.asyncio
+async def test_replay_into_stalled_writer_evicts_instead_of_blocking(fake_redis):
+    manager = ConnectionManager(max_queue_size=2, send_timeout=10)
+    conversation_id = uuid4()
+    websocket = FakeWebSocket(stalled=True)
+    connection = await manager.connect(conversation_id, websocket)
+
+    connection.hold()
+    connection.send("live")
+    connection.release([f"m{n}" for n in range(10)])
+    await _drain()
+
+    assert connection.closed
+    assert websocket.close_code == 1008
+    assert manager.connection_count == 0
+    assert fake_redis.pubsub_instance.channels == set()
+
+
+@pytest.mark.asyncio
+async def test_replay_returns_frames_after_cursor(fake_redis):
+    manager = ConnectionManager()
+    conversation_id = uuid4()
+    message_ids = [uuid4() for _ in range(120)]
+    fake_redis.streams[f"conversation:{conversation_id}:events"] = [
+        (f"{n}-0", {"message_id": str(message_id), "frame": f"m{n}"})
+        for n, message_id in enumerate(message_ids)
+    ]
+
+    assert await manager.replay(conversation_id, message_ids[-3], limit=10) == ["m118", "m119"]
+    assert await manager.replay(conversation_id, message_ids[-1], limit=10) == []
+    assert await manager.replay(conversation_id, message_ids[0], limit=10) is None
+    assert await manager.replay(conversation_id, uuid4(), limit=500) is None
+
+
+@pytest.mark.asyncio
+async def test_replay_gap_just_over_limit_is_truncated_mid_chunk(fake_redis):
+    manager = ConnectionManager()
+    conversation_id = uuid4()
+    message_ids = [uuid4() for _ in range(120)]
+    fake_redis.streams[f"conversation:{conversation_id}:events"] = [
+        (f"{n}-0", {"message_id": str(message_id), "frame": f"m{n}"})
+        for n, message_id in enumerate(message_ids)
+    ]
+
+    # 11 frames follow the cursor: one too many, well inside the first chunk.
+    assert await manager.replay(conversation_id, message_ids[-12], limit=10) is None
+    assert len(await manager.replay(conversation_id, message_ids[-11], limit=10)) == 10
+
+
+@pytest.mark.asyncio
+async def test_manager_exposes_connection_and_failure_metrics(fake_redis):
+    manager = ConnectionManager(max_queue_size=1, send_timeout=10)
+    conversation_id = uuid4()
+    await manager.connect(conversation_id, FakeWebSocket())
+    await manager.connect(conversation_id, FakeWebSocket(stalled=True))
+
+    assert manager.connection_count == 2
+    assert manager.conversation_count == 1
+    assert manager.conversations_by_connection_count()[("2",)] == 1
+    assert sum(manager.conversations_by_connection_count().values()) == 1
+    assert manager.listener_count == 1
+
+    queue_full = BROADCAST_FAILURES.labels("queue_full")
+    before = queue_full.value
+    for n in range(3):
+        await manager.broadcast(conversation_id, f"m{n}")
+        await _drain()
+
+    assert queue_full.value == before + 1
+    assert manager.connection_count == 1
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_evicted_sockets_to_close(fake_redis, mocker):
+    mocker.patch.object(settings, "WS_DRAIN_WAVE_INTERVAL_SECONDS", 0.01)
+    manager = ConnectionManager()
+    websocket = FakeWebSocket()
+    connection = await manager.connect(uuid4(), websocket)
+
+    manager.evict(connection, reason="heartbeat")
+    assert len(manager._close_tasks) == 1
+    await manager.drain()
+
+    assert websocket.close_code == 1008
+    assert not manager._close_tasks
+
+
+class CountingCodec(JSONCodec):
+    subprotocol = "chat.counting.v1"
+    binary = True
+
+    def __init__(self):
+        self.encodes = 0
+
+    def encode(self, frame):
+        self.encodes += 1
+        return frame.encode()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_encodes_once_per_codec(fake_redis):
+    manager = ConnectionManager()
+    conversation_id = uuid4()
+    codec = CountingCodec()
+    json_sockets = [FakeWebSocket() for _ in range(3)]
+    binary_sockets = [FakeWebSocket() for _ in range(3)]
+    for websocket in json_sockets:
+        await manager.subscribe(manager.register(websocket, JSON_CODEC), conversation_id)
+    for websocket in binary_sockets:
+        await manager.subscribe(manager.register(websocket, codec), conversation_id)
+
+    await manager.broadcast(conversation_id, '{"n": 1}')
+    await _drain()
+
+    assert codec.encodes == 1
+    assert all(websocket.sent == ['{"n": 1}'] for websocket in json_sockets)
+    assert all(websocket.sent == [b'{"n": 1}'] for websocket in binary_sockets)
+
+
+@pytest.mark.asyncio
+async def test_silent_socket_is_pinged_then_closed(fake_redis):
+    manager = ConnectionManager(heartbeat_interval=0.032, max_missed_heartbeats=2)
+    silent_ws, chatty_ws = FakeWebSocket(), FakeWebSocket()
+    manager.register(silent_ws)
+    chatty = manager.register(chatty_ws)
+
+    for _ in range(100):
+        chatty.mark_alive()
+        await asyncio.sleep(0.01)
+        if silent_ws.close_code is not None:
+            break
+
+    assert silent_ws.sent == ['{"type":"ping"}', '{"type":"ping"}']
+    assert silent_ws.close_code == 1001
+    assert chatty_ws.sent == []
+    assert chatty_ws.close_code is None
+    assert manager.connection_count == 1
+
+    await manager.disconnect(chatty)
+
+
+@pytest.mark.asyncio
+async def test_drain_sends_reconnect_then_closes_in_waves(fake_redis, mocker):
+    mocker.patch.object(settings, "WS_DRAIN_WAVES", 2)
+    mocker.patch.object(settings, "WS_DRAIN_WAVE_INTERVAL_SECONDS", 0.01)
+    manager = ConnectionManager()
+    conversation_id = uuid4()
+    sockets = [FakeWebSocket() for _ in range(4)]
+    for websocket in sockets:
+        await manager.connect(conversation_id, websocket)
+
+    await asyncio.gather(manager.drain(), manager.drain())
+
+    assert manager.draining
+    for websocket in sockets:
+        assert json.loads(websocket.sent[0])["type"] == "reconnect"
+        assert 0 <= json.loads(websocket.sent[0])["retry_after"] <= 10
+        assert websocket.close_code == 1012
+    assert manager.connection_count == 0
+    assert fake_redis.pubsub_instance.closed
+
+
+@pytest.mark.asyncio
+async def test_subscribe_racing_a_drain_fails_instead_of_hanging(fake_redis, mocker):
+    mocker.patch.object(settings, "WS_DRAIN_WAVE_INTERVAL_SECONDS", 0.01)
+    manager = ConnectionManager()
+    stuck = asyncio.Event()
+
+    async def subscribe_forever(*channels):
+        await stuck.wait()
+
+    fake_redis.pubsub_instance.subscribe = subscribe_forever
+    connection = manager.register(FakeWebSocket())
+    subscribing = asyncio.create_task(manager.subscribe(connection, uuid4()))
+    await _drain()
+
+    await asyncio.wait_for(manager.drain(), timeout=1)
+
+    with pytest.raises(WebSocketDisconnect):
+        await asyncio.wait_for(subscribing, timeout=1)
+    with pytest.raises(WebSocketDisconnect):
+        await manager.subscribe(manager.register(FakeWebSocket()), uuid4())
+
+
+@pytest.mark.asyncio
+async def test_sigterm_drains_before_chaining_to_previous_handler(fake_redis, mocker):
+    from app import main
+
+    manager = ConnectionManager()
+    mocker.patch.object(main, "ws_manager", manager)
+    websocket = FakeWebSocket()
+    manager.register(websocket)
+
+    chained = asyncio.Event()
+    original = signal.signal(signal.SIGTERM, lambda signum, frame: chained.set())
+    try:
+        main._drain_before_sigterm()
+        signal.raise_signal(signal.SIGTERM)
+        await asyncio.wait_for(chained.wait(), 1)
+    finally:
+        signal.signal(signal.SIGTERM, original)
+
+    assert manager.draining
+    assert websocket.close_code == 1012